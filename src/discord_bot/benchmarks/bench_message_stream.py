@@ -0,0 +1,173 @@
+# imports
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import importlib.util
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+"""make the bot modules importable when running "python benchmarks/bench_message_stream.py" from src/discord_bot"""
+botDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, botDirectory)
+
+from berb_bot import BerbBot, get_prefix    # noqa: E402
+from database import Database    # noqa: E402
+from migrations import run_migrations    # noqa: E402
+from prefix_cache import PrefixCache    # noqa: E402
+from message_counter import MessageCounter    # noqa: E402
+from leaderboard import Leaderboard    # noqa: E402
+
+
+# benchmark
+"""synthetic message stream for the hot path of every message: BerbBot.get_prefix, get_prefix and
+OnMessageListener.on_message; runs without a gateway connection against a temporary "databank.db"
+
+usage (from src/discord_bot): python benchmarks/bench_message_stream.py [--messages 100000] [--max-p99-ms 1.0]
+"""
+
+
+def load_on_message_listener():
+    """imports the on_message extension (its file name is not a valid module name)"""
+    path = os.path.join(botDirectory, 'ext', 'listeners', 'general', 'lis_-_on_message.py')
+    spec = importlib.util.spec_from_file_location('lis_on_message', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module.OnMessageListener
+
+
+def create_client(database_path, guilds, custom_prefix_ratio):
+    """creates a stand-in for the client with the same services as the real one"""
+    database = Database(database_path)
+    run_migrations(database)
+
+    client = SimpleNamespace(user=SimpleNamespace(id=1), database=database)
+    client.prefix_cache = PrefixCache(database, ['.', 'b.', 'pls'])
+    client.message_counter = MessageCounter(database)
+    client.leaderboard = Leaderboard(database)
+
+    # give some guilds custom prefixes
+    database.run_blocking(lambda connection: connection.executemany(
+        """INSERT INTO prefix_assignment(guild_id, guild_prefix) VALUES(?, ?)""",
+        [(guild_id, '!') for guild_id in range(guilds) if random.random() < custom_prefix_ratio]))
+
+    client.prefix_cache.load()
+    client.leaderboard.warm()
+
+    return client
+
+
+def create_messages(amount, guilds, users, command_ratio):
+    """creates discord.Message stand-ins with the attributes used by the hot path"""
+    contents = ['hello there', 'lol', 'did anyone see the game yesterday?', 'https://example.com/cat.png']
+    commands = ['.help', 'b.meme', 'pls joke', '!leaderboard', '<@1> help']
+
+    guild_objects = [SimpleNamespace(id=guild_id) for guild_id in range(guilds)]
+    user_objects = [SimpleNamespace(id=1000 + user_id) for user_id in range(users)]
+
+    messages = []
+    for _ in range(amount):
+        content = random.choice(commands) if random.random() < command_ratio else random.choice(contents)
+        messages.append(SimpleNamespace(guild=random.choice(guild_objects), author=random.choice(user_objects),
+                                        content=content, created_at=datetime.now(timezone.utc)))
+
+    return messages
+
+
+def percentile(sorted_values, fraction):
+    """returns the value at the given fraction of a sorted list"""
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_benchmark(arguments):
+    """feeds the messages through the hot path and returns the results"""
+    random.seed(arguments.seed)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        client = create_client(os.path.join(temporary_directory, 'databank.db'),
+                               arguments.guilds, arguments.custom_prefix_ratio)
+        client.loop = asyncio.get_running_loop()
+
+        # count every statement sqlite executes
+        sqlite_operations = [0]
+
+        def trace(statement):
+            sqlite_operations[0] += 1
+
+        client.database.run_blocking(lambda connection: connection.set_trace_callback(trace))
+        sqlite_operations[0] = 0
+
+        listener = load_on_message_listener()(client)
+        messages = create_messages(arguments.messages, arguments.guilds, arguments.users, arguments.command_ratio)
+
+        latencies = []
+        start = time.perf_counter()
+
+        for message in messages:
+            message_start = time.perf_counter()
+
+            await BerbBot.get_prefix(client, message)
+            get_prefix(client, message)
+            await listener.on_message(message)
+
+            latencies.append(time.perf_counter() - message_start)
+
+        duration = time.perf_counter() - start
+
+        # write the remaining counts, like the bot does on shutdown
+        listener.flush_message_counter.cancel()
+        await client.message_counter.flush()
+
+        client.database.close()
+
+    latencies.sort()
+
+    return {
+        'messages': len(messages),
+        'duration': duration,
+        'throughput': len(messages) / duration,
+        'p50': percentile(latencies, 0.50),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1],
+        'sqlite_operations': sqlite_operations[0],
+        'flushes': client.message_counter.flushes,
+        'prefix_cache': client.prefix_cache.stats()
+    }
+
+
+def main():
+    """parses the arguments, runs the benchmark and prints the results"""
+    parser = argparse.ArgumentParser(description='benchmark for the get_prefix/ on_message hot path')
+    parser.add_argument('--messages', type=int, default=100000, help='number of messages to feed through')
+    parser.add_argument('--guilds', type=int, default=500, help='number of guilds the messages are spread over')
+    parser.add_argument('--users', type=int, default=20000, help='number of users the messages are spread over')
+    parser.add_argument('--command-ratio', type=float, default=0.05, help='fraction of messages that are commands')
+    parser.add_argument('--custom-prefix-ratio', type=float, default=0.2,
+                        help='fraction of guilds with custom prefixes')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the generated messages')
+    parser.add_argument('--max-p99-ms', type=float, default=None,
+                        help='exit with status 1 if the p99 latency per message is higher (regression check)')
+    arguments = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(arguments))
+
+    print(f'messages:          {results["messages"]}')
+    print(f'duration:          {results["duration"]:.3f}s')
+    print(f'throughput:        {results["throughput"]:.0f} messages/s')
+    print(f'latency p50:       {results["p50"] * 1000:.4f}ms')
+    print(f'latency p99:       {results["p99"] * 1000:.4f}ms')
+    print(f'latency max:       {results["max"] * 1000:.4f}ms')
+    print(f'sqlite operations: {results["sqlite_operations"]} ({results["flushes"]} flushes)')
+    print(f'prefix cache:      {results["prefix_cache"]}')
+
+    if arguments.max_p99_ms is not None and results['p99'] * 1000 > arguments.max_p99_ms:
+        print(f'p99 latency is higher than {arguments.max_p99_ms}ms')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
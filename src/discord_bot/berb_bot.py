@@ -0,0 +1,38 @@
+# imports
+import logging
+from discord.ext import bridge
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+def get_prefix(client, message):
+    """custom function for getting the prefixes from the prefix cache so custom prefixes can be set for guilds"""
+    guild = message.guild
+
+    # only allow custom prefixes in guilds, the prefix cache uses the default prefixes for direct messages (None)
+    # the precompiled list has the same order as "commands.when_mentioned_or" (mentions first)
+    return client.prefix_cache.matcher(guild.id if guild else None, client.user.id).prefix_list
+
+
+class BerbBot(bridge.Bot):
+    """bridge.Bot that matches prefixes using the precompiled prefix matchers of the prefix cache"""
+    async def close(self):
+        """closes the shared http session before the client itself"""
+        await self.http_client.close()
+        await super().close()
+
+    async def get_prefix(self, message):
+        """returns the prefix the message starts with, so non-command messages are rejected right away"""
+        guild = message.guild
+        matcher = self.prefix_cache.matcher(guild.id if guild else None, self.user.id)
+
+        prefix = matcher.match(message.content)
+        if prefix is None:
+            # none of the prefixes matches, hand over the first one only so the library rejects the message
+            # after a single comparison instead of trying every prefix again
+            return matcher.prefix_list[0]
+
+        return prefix
@@ -20,6 +20,9 @@ embedColor = int(os.getenv('EMBED_COLOR'))
 
 # class fpr custom help command
 class CustomHelpCommand(commands.HelpCommand):
+    # rendered help pages, shared by every copy of the help command (the library copies it for every invocation)
+    # {('bot', None) | ('cog', qualified_name) | ('group', qualified_name) | ('command', qualified_name): embed}
+    embed_cache = {}
 
     def __init__(self):
         self.name = 'help'
@@ -28,11 +31,60 @@ class CustomHelpCommand(commands.HelpCommand):
 
         super().__init__()
 
-    async def send_bot_help(self, mapping):
-        global embedColor
+    # ------
+    # cache
+    # ------
+
+    @classmethod
+    def invalidate_cache(cls):
+        """drops all rendered help pages, call this whenever extensions are loaded, unloaded or reloaded"""
+        cls.embed_cache.clear()
+
+    def render_cache(self, bot):
+        """renders the help pages of the bot and of every cog, group and command once"""
+        self.invalidate_cache()
+
+        self.embed_cache[('bot', None)] = self.render_bot_help(bot)
+
+        for cog in bot.cogs.values():
+            self.embed_cache[('cog', cog.qualified_name)] = self.render_cog_help(cog)
+
+        for command in bot.walk_commands():
+            if isinstance(command, commands.Group):
+                self.embed_cache[('group', command.qualified_name)] = self.render_group_help(command)
+
+            self.embed_cache[('command', command.qualified_name)] = self.render_command_help(command)
+
+        logger.info(f'rendered {len(self.embed_cache)} help pages')
+
+    def get_cached(self, key, render, *args):
+        """returns a rendered help page, pages that are not cached yet are rendered and cached"""
+        embed = self.embed_cache.get(key)
+
+        if embed is None:
+            embed = self.embed_cache[key] = render(*args)
+
+        return embed
+
+    @staticmethod
+    def finalize(embed):
+        """copies a cached help page and applies the current time, so the cached page is never changed"""
         time = datetime.now()
         formatted_time = time.strftime('%H:%M')
 
+        embed = embed.copy()
+        embed.set_footer(text=f'BerbBot - {formatted_time}')
+
+        return embed
+
+    # ------
+    # rendering
+    # ------
+
+    @staticmethod
+    def render_bot_help(bot):
+        global embedColor
+
         # design embed
         embed = discord.Embed(title='Help - Bot',
                               description='**An overview of all available commands**\n'
@@ -40,28 +92,23 @@ class CustomHelpCommand(commands.HelpCommand):
                                           'a slash command with the same name.\n',
                               color=embedColor)
 
-        embed.set_footer(text=f'BerbBot - {formatted_time}')
-
         # add content
-        for cog in mapping:
-            if cog is not None:
-                if 'listener' in cog.qualified_name.lower():
-                    break
+        for cog in bot.cogs.values():
+            if 'listener' in cog.qualified_name.lower():
+                break
 
-                cog_name = cog.qualified_name
-                cog_commands = '\n'.join(command.name for command in mapping[cog])
+            cog_name = cog.qualified_name
+            cog_commands = '\n'.join(command.name for command in cog.get_commands())
 
-                embed.add_field(name=cog_name,
-                                value=cog_commands,
-                                inline=False)
+            embed.add_field(name=cog_name,
+                            value=cog_commands,
+                            inline=False)
 
-        # send embed
-        await self.get_destination().send(embed=embed)
+        return embed
 
-    async def send_cog_help(self, cog):
+    @staticmethod
+    def render_cog_help(cog):
         global embedColor
-        time = datetime.now()
-        formatted_time = time.strftime('%H:%M')
 
         # create embed
         embed = discord.Embed(title='Help - Cog',
@@ -73,15 +120,11 @@ class CustomHelpCommand(commands.HelpCommand):
                         value=cog_commands,
                         inline=False)
 
-        embed.set_footer(text=f'BerbBot - {formatted_time}')
-
-        # send embed
-        await self.get_destination().send(embed=embed)
+        return embed
 
-    async def send_group_help(self, group):
+    @staticmethod
+    def render_group_help(group):
         global embedColor
-        time = datetime.now()
-        formatted_time = time.strftime('%H:%M')
 
         # create embed
         embed = discord.Embed(title='Help - Group',
@@ -93,39 +136,60 @@ class CustomHelpCommand(commands.HelpCommand):
                         value=group_commands,
                         inline=False)
 
-        embed.set_footer(text=f'BerbBot - {formatted_time}')
-
-        # send embed
-        await self.get_destination().send(embed=embed)
+        return embed
 
-    async def send_command_help(self, command):
+    def render_command_help(self, command):
         global embedColor
-        time = datetime.now()
-        formatted_time = time.strftime('%H:%M')
 
-        # create embed
+        # create embed, the usage field is added when sending, as it contains the prefix
         # include help for the help command itself
         if command.qualified_name == 'help':
             embed = discord.Embed(title=f'Help - Command',
                                   description=f'{self.description}\n',
                                   color=embedColor)
 
-            embed.add_field(name=self.name,
-                            value=f'`{self.usage}`',
-                            inline=False)
-
-            embed.set_footer(text=f'BerbBot - {formatted_time}')
-
         else:
             embed = discord.Embed(title=f'Help - Command',
                                   description=f'{command.description}\n',
                                   color=embedColor)
 
+        return embed
+
+    # ------
+    # sending
+    # ------
+
+    async def send_bot_help(self, mapping):
+        embed = self.get_cached(('bot', None), self.render_bot_help, self.context.bot)
+
+        # send embed
+        await self.get_destination().send(embed=self.finalize(embed))
+
+    async def send_cog_help(self, cog):
+        embed = self.get_cached(('cog', cog.qualified_name), self.render_cog_help, cog)
+
+        # send embed
+        await self.get_destination().send(embed=self.finalize(embed))
+
+    async def send_group_help(self, group):
+        embed = self.get_cached(('group', group.qualified_name), self.render_group_help, group)
+
+        # send embed
+        await self.get_destination().send(embed=self.finalize(embed))
+
+    async def send_command_help(self, command):
+        embed = self.finalize(self.get_cached(('command', command.qualified_name), self.render_command_help, command))
+
+        # add the usage with the prefix of the current guild
+        if command.qualified_name == 'help':
+            embed.add_field(name=self.name,
+                            value=f'`{self.usage}`',
+                            inline=False)
+
+        else:
             embed.add_field(name=command.name,
                             value=f'`{self.get_command_signature(command)}`',
                             inline=False)
 
-            embed.set_footer(text=f'BerbBot - {formatted_time}')
-
         # send embed
         await self.get_destination().send(embed=embed)
@@ -0,0 +1,129 @@
+# imports
+import logging
+import sqlite3
+import asyncio
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# database
+class Database:
+    """shared, long-lived connection to "databank.db"
+
+    all queries are executed on one dedicated executor thread, so a slow disk never blocks the event loop
+    and the connection (and its statement cache) can be reused by every cog
+    """
+    def __init__(self, database_path, slow_query_threshold=0.1):
+        self.database_path = database_path
+        self.slow_query_threshold = slow_query_threshold    # seconds
+
+        # a single worker thread serializes all access to the connection
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='databank')
+        self.connection = None
+
+        self.query_stats = {}    # {label: {'count': int, 'total': seconds, 'max': seconds}, ...}
+
+    # ------
+    # executor thread
+    # ------
+
+    def _connect(self):
+        """opens the connection; only ever called on the executor thread (pragmas are set by "run_migrations")"""
+        self.connection = sqlite3.connect(self.database_path, check_same_thread=False, cached_statements=256)
+
+        logger.info(f'connected to {self.database_path}')
+
+    def _call(self, function, label):
+        """runs function(connection) inside one transaction and records its latency"""
+        if self.connection is None:
+            self._connect()
+
+        start = perf_counter()
+        try:
+            with self.connection:    # commits on success, rolls back on exceptions
+                return function(self.connection)
+
+        finally:
+            self._record(label, perf_counter() - start)
+
+    def _record(self, label, duration):
+        """updates the latency statistics for a query"""
+        stats = self.query_stats.setdefault(label, {'count': 0, 'total': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['total'] += duration
+        stats['max'] = max(stats['max'], duration)
+
+        if duration >= self.slow_query_threshold:
+            logger.warning(f'slow query ({duration * 1000:.1f}ms): {label}')
+        else:
+            logger.debug(f'query ({duration * 1000:.1f}ms): {label}')
+
+    # ------
+    # async api (use these from commands and listeners)
+    # ------
+
+    async def run(self, function, label=None):
+        """runs function(connection) on the executor thread inside one transaction"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call, function,
+                                          label or getattr(function, '__name__', 'transaction'))
+
+    async def execute(self, sql, parameters=()):
+        """executes a single parameterized statement"""
+        return await self.run(lambda connection: connection.execute(sql, parameters).rowcount, sql)
+
+    async def executemany(self, sql, seq_of_parameters):
+        """executes a parameterized statement for every set of parameters inside one transaction"""
+        return await self.run(lambda connection: connection.executemany(sql, seq_of_parameters).rowcount, sql)
+
+    async def fetchall(self, sql, parameters=()):
+        """executes a parameterized query and returns all rows"""
+        return await self.run(lambda connection: connection.execute(sql, parameters).fetchall(), sql)
+
+    async def fetchone(self, sql, parameters=()):
+        """executes a parameterized query and returns the first row or None"""
+        return await self.run(lambda connection: connection.execute(sql, parameters).fetchone(), sql)
+
+    # ------
+    # blocking api (only use these before the event loop is running, e.g. in main())
+    # ------
+
+    def run_blocking(self, function, label=None):
+        """runs function(connection) on the executor thread and waits for the result"""
+        return self.executor.submit(self._call, function,
+                                    label or getattr(function, '__name__', 'transaction')).result()
+
+    def fetchall_blocking(self, sql, parameters=()):
+        """executes a parameterized query, waits for it and returns all rows"""
+        return self.run_blocking(lambda connection: connection.execute(sql, parameters).fetchall(), sql)
+
+    # ------
+    # misc
+    # ------
+
+    def stats(self):
+        """returns the latency statistics of all executed queries, slowest average first"""
+        stats = [
+            {'query': ' '.join(label.split()), 'count': data['count'],
+             'average': data['total'] / data['count'], 'max': data['max']}
+            for label, data in self.query_stats.items()
+        ]
+
+        return sorted(stats, key=lambda query_stats: query_stats['average'], reverse=True)
+
+    def close(self):
+        """closes the connection and shuts down the executor thread"""
+        def close_connection():
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+        self.executor.submit(close_connection).result()
+        self.executor.shutdown(wait=True)
+
+        logger.info(f'closed connection to {self.database_path}')
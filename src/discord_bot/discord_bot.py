@@ -5,9 +5,15 @@ import logging
 from logging import config
 import dotenv
 import discord
-from discord.ext import commands, bridge
 from custom_help_command import CustomHelpCommand
-import sqlite3
+from berb_bot import BerbBot, get_prefix
+from database import Database
+from migrations import run_migrations
+from prefix_cache import PrefixCache
+from message_counter import MessageCounter
+from leaderboard import Leaderboard
+from http_client import HttpClient
+from mojang_uuid import UuidResolver
 import ast
 
 
@@ -27,56 +33,10 @@ dotenv.load_dotenv()
 defaultPrefixes = ast.literal_eval(os.getenv('DEFAULT_PREFIXES'))   # string needs to be converted to list
 
 
-def get_prefix(client, message):
-    """custom function for getting the prefixes from "databank.db" so custom prefixes can be set for guilds"""
-    guild = message.guild
-
-    # only allow custom prefixes in guilds
-    if guild:
-        # needed data
-        guild_id = guild.id
-
-        # connect to "databank.db" and create cursor
-        connection = sqlite3.connect('../../data/databank.db')
-        cursor = connection.cursor()
-
-        # create table if it does not exist
-        sql_command_query = """CREATE TABLE IF NOT EXISTS 
-        prefix_assignment(guild_id INTEGER, guild_prefix TEXT)"""
-        cursor.execute(sql_command_query)
-
-        # get needed information
-        sql_command_query = f"""SELECT * FROM prefix_assignment WHERE guild_id = {guild_id}"""
-        cursor.execute(sql_command_query)
-        rows = cursor.fetchall()
-
-        # close connection
-        cursor.close()
-        connection.close()
-
-        # check if there are entries for the guild id, if there are, return custom prefixes
-        if rows:
-            prefix_list = []
-
-            # there are entries, add all the prefixes to the prefix_list and return the list
-            for row in rows:
-                prefix = row[1]
-                prefix_list.append(prefix)
-
-            return commands.when_mentioned_or(*prefix_list)(client, message)
-
-        else:
-            # there aren't any entries, therefore, return the default prefixes
-            return commands.when_mentioned_or(*defaultPrefixes)(client, message)
-
-    else:
-        return commands.when_mentioned_or(*defaultPrefixes)(client, message)
-
-
 # create bot
 """create the client (bot)"""
 intents = discord.Intents.all()
-client = bridge.Bot(
+client = BerbBot(
     command_prefix=get_prefix,
     strip_after_prefix=True,
     case_insensitive=True,
@@ -85,6 +45,24 @@ client = bridge.Bot(
     debug_guilds=[967030034240012328]
 )
 
+"""share one long-lived connection to "databank.db" between all cogs"""
+client.database = Database('../../data/databank.db')
+
+"""keep the custom prefixes in memory, so "get_prefix" does not have to query "databank.db" for every message"""
+client.prefix_cache = PrefixCache(client.database, defaultPrefixes)
+
+"""buffer message counts in memory and write them to "databank.db" in batches"""
+client.message_counter = MessageCounter(client.database)
+
+"""keep the top posters of every guild in memory, so the leaderboard command never has to sort all members"""
+client.leaderboard = Leaderboard(client.database)
+
+"""share one pooled http session between all cogs that call external apis, it is closed together with the client"""
+client.http_client = HttpClient()
+
+"""resolve minecraft player names in bulk and keep the uuids in "databank.db", names rarely change"""
+client.uuid_resolver = UuidResolver(client.database, client.http_client)
+
 
 # define main function for running bot
 def main():
@@ -111,11 +89,30 @@ def main():
                     logger.critical(f'failed loading extension {dotted_dir_path}.{file_name[:-3]}')
                     logger.error(f'error: "{error}"')
 
+    # render the help pages once, they are only rendered again when extensions are (re/un)loaded
+    client.help_command.render_cache(client)
+
+    # bring "databank.db" up to date, no command or listener has to create tables afterwards
+    logger.info('migrating "databank.db"...')
+    run_migrations(client.database)
+
+    # load custom prefixes once before any message is processed
+    logger.info('loading custom prefixes...')
+    client.prefix_cache.load()
+
+    # load the message counts for the leaderboards once
+    logger.info('warming leaderboards...')
+    client.leaderboard.warm()
+
     # run
     logger.info('executing...')
     """run the code and start the client"""
     client.run(os.getenv('DISCORD_TOKEN'))
 
+    # write the remaining message counts and close the connection to "databank.db" after the client has been closed
+    client.message_counter.flush_blocking()
+    client.database.close()
+
 
 if __name__ == '__main__':
     main()
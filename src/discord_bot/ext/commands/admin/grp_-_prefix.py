@@ -4,7 +4,6 @@ import logging
 import dotenv
 import discord
 from discord.ext import commands, bridge
-import sqlite3
 import ast
 from datetime import datetime
 
@@ -77,25 +76,8 @@ class Prefix(commands.Cog, name='Prefix', description='contains prefix command g
         guild_id = ctx.guild.id
         prefix_list = prefixes.split(' ')
 
-        # connect to "databank.db" and create cursor
-        connection = sqlite3.connect('../../data/databank.db')
-        cursor = connection.cursor()
-
-        # delete existing prefix assignments
-        sql_command_query = f"""DELETE FROM prefix_assignment WHERE guild_id = {guild_id}"""
-        cursor.execute(sql_command_query)
-
-        # make a new entry for every prefix with the corresponding guild id
-        for prefix in prefix_list:
-            sql_command_query = f"""INSERT INTO prefix_assignment(guild_id, guild_prefix) 
-            VALUES({guild_id}, "{prefix}"); """
-            cursor.execute(sql_command_query)
-
-        # commit changes and close connection
-        cursor.close()
-
-        connection.commit()
-        connection.close()
+        # replace the prefix assignments in "databank.db" and in the prefix cache
+        await self.client.prefix_cache.set(guild_id, prefix_list)
 
         # get bot prefixes for embed
         complete_prefix_list = self.client.command_prefix(self.client, ctx.message)
@@ -129,19 +111,8 @@ class Prefix(commands.Cog, name='Prefix', description='contains prefix command g
         # needed data
         guild_id = ctx.guild.id
 
-        # connect to "databank.db" and create cursor
-        connection = sqlite3.connect('../../data/databank.db')
-        cursor = connection.cursor()
-
-        # delete existing prefix assignments
-        sql_command_query = f"""DELETE FROM prefix_assignment WHERE guild_id = {guild_id}"""
-        cursor.execute(sql_command_query)
-
-        # commit changes and close connection
-        cursor.close()
-
-        connection.commit()
-        connection.close()
+        # delete the prefix assignments in "databank.db" and in the prefix cache
+        await self.client.prefix_cache.reset(guild_id)
 
         # get bot prefixes for embed
         complete_prefix_list = self.client.command_prefix(self.client, ctx.message)
@@ -4,7 +4,6 @@ import logging
 import dotenv
 import discord
 from discord.ext import commands, bridge
-import requests
 from datetime import datetime
 
 
@@ -25,8 +24,6 @@ class Animal(commands.Cog, name='Animal', description='contains animal command')
     def __init__(self, client):
         self.client = client
 
-        self.request_session = requests.Session()
-
     @bridge.bridge_command(name='animal', description='sends a random picture of a given animal type')
     async def animal(self, ctx: bridge.BridgeContext, animal_type: str):
         """sends a random picture of a given animal type"""
@@ -54,7 +51,11 @@ class Animal(commands.Cog, name='Animal', description='contains animal command')
             # do request
             request_url = f'https://apis.duncte123.me/animal/{animal_type}'
             headers = {'User-Agent': str(self.client.user)}
-            data = self.request_session.get(request_url, headers=headers).json()
+            try:
+                data = await self.client.http_client.get_json(request_url, headers=headers)
+            except Exception as e:
+                logger.exception(e)
+                data = {'success': False}
 
             # if request succeeded, send embed with image
             if data['success']:
@@ -4,7 +4,6 @@ import logging
 import dotenv
 import discord
 from discord.ext import commands, bridge
-import requests
 from datetime import datetime
 
 
@@ -25,8 +24,6 @@ class Joke(commands.Cog, name='Joke', description='contains joke command'):
     def __init__(self, client):
         self.client = client
 
-        self.request_session = requests.Session()
-
     # @commands.command(name='joke', description='sends a random joke')
     @bridge.bridge_command(name='joke', description='sends a random joke')
     async def joke(self, ctx: bridge.BridgeContext):
@@ -40,7 +37,11 @@ class Joke(commands.Cog, name='Joke', description='contains joke command'):
         # do request
         request_url = 'https://apis.duncte123.me/joke'
         headers = {'User-Agent': str(self.client.user)}
-        data = self.request_session.get(request_url, headers=headers).json()
+        try:
+            data = await self.client.http_client.get_json(request_url, headers=headers)
+        except Exception as e:
+            logger.exception(e)
+            data = {'success': False}
 
         # if request succeeded, send embed with image
         if data['success']:
@@ -4,7 +4,6 @@ import logging
 import dotenv
 import discord
 from discord.ext import commands, bridge
-import requests
 from datetime import datetime
 
 
@@ -25,8 +24,6 @@ class Meme(commands.Cog, name='Meme', description='contains meme command'):
     def __init__(self, client):
         self.client = client
 
-        self.request_session = requests.Session()
-
     @bridge.bridge_command(name='meme', description='sends a random meme')
     async def meme(self, ctx: bridge.BridgeContext):
         """sends a random meme"""
@@ -39,7 +36,11 @@ class Meme(commands.Cog, name='Meme', description='contains meme command'):
         # do request
         request_url = f'https://apis.duncte123.me/meme'
         headers = {'User-Agent': str(self.client.user)}
-        data = self.request_session.get(request_url, headers=headers).json()
+        try:
+            data = await self.client.http_client.get_json(request_url, headers=headers)
+        except Exception as e:
+            logger.exception(e)
+            data = {'success': False}
 
         # if request succeeded, send embed with image
         if data['success']:
@@ -4,7 +4,6 @@ import logging
 import dotenv
 import discord
 from discord.ext import commands, bridge
-import sqlite3
 from datetime import datetime
 
 # logging
@@ -38,27 +37,14 @@ class Statistics(commands.Cog, name='Statistics', description='contains statisti
         guild_id = ctx.guild.id
         user_id = member.id
 
-        # get message count for user
-        # connect to "databank.db" and create cursor
-        connection = sqlite3.connect('../../data/databank.db')
-        cursor = connection.cursor()
+        # get message activity for user, including the messages that have not been written to "databank.db" yet
+        member_activity = await self.client.message_counter.get_activity(guild_id, user_id, days=7, hours=24)
 
-        # get needed information
-        sql_command_query = f"""SELECT * FROM message_counter WHERE guild_id = {guild_id} AND user_id = {user_id}"""
-        cursor.execute(sql_command_query)
-        rows = cursor.fetchall()
-
-        # close connection
-        cursor.close()
-        connection.close()
-
-        # if there is an entry, get the message_count for the server member, otherwise it will be 0
-        member_message_count = 0
-
-        if rows:
-            # there is an entry
-            row = rows[0]
-            member_message_count = row[2]
+        if member_activity['most_active_hour'] is not None:
+            most_active_hour = f'{member_activity["most_active_hour"]:02d}:00 - ' \
+                               f'{(member_activity["most_active_hour"] + 1) % 24:02d}:00 (UTC)'
+        else:
+            most_active_hour = '-'
 
         # create embed
         embed = discord.Embed(title='User Statistics',
@@ -103,7 +89,10 @@ class Statistics(commands.Cog, name='Statistics', description='contains statisti
                                            f'Early Supporter: `{member.public_flags.early_supporter}`\n'
                                            f'Team User: `{member.public_flags.team_user}`',
                         inline=False)
-        embed.add_field(name='Berb-Bot', value=f'Messages sent on this server: {member_message_count}',
+        embed.add_field(name='Berb-Bot', value=f'Messages sent on this server: {member_activity["total"]}\n'
+                                               f'Messages sent in the last 24 hours: {member_activity["last_hours"]}\n'
+                                               f'Messages sent in the last 7 days: {member_activity["last_days"]}\n'
+                                               f'Most active hour: {most_active_hour}',
                         inline=False)
 
         # send embed
@@ -153,6 +142,41 @@ class Statistics(commands.Cog, name='Statistics', description='contains statisti
         # send embed
         await ctx.respond(embed=embed)
 
+    @bridge.bridge_command(name='leaderboard', aliases=['top'], description='sends the members with the most messages '
+                                                                            'on this server')
+    @commands.guild_only()
+    async def leaderboard(self, ctx: bridge.BridgeContext, amount: int = 10):
+        """sends the members with the most messages on this server"""
+        global embedColor
+        time = datetime.now()
+        formatted_time = time.strftime('%H:%M')
+
+        # the leaderboard only keeps the top members of every guild
+        amount = min(max(amount, 1), self.client.leaderboard.size)
+
+        # the leaderboard is kept in memory and updated for every message, no query needed
+        top_members = self.client.leaderboard.get_top(ctx.guild.id, amount)
+
+        # create embed
+        embed = discord.Embed(title='Leaderboard',
+                              description=f'The members with the most messages on **{ctx.guild.name}**\n',
+                              color=embedColor)
+        embed.set_author(name=f'Requested by: {ctx.author}',
+                         icon_url=ctx.author.avatar.url)
+        embed.set_footer(text=f'BerbBot - {formatted_time}')
+
+        # add content, the places go into the description as a field can only hold 1024 characters
+        if top_members:
+            embed.description += '\n' + '\n'.join(f'**{place}.** <@{user_id}>: `{message_count}` messages'
+                                                  for place, (user_id, message_count)
+                                                  in enumerate(top_members, start=1))
+
+        else:
+            embed.add_field(name='Messages', value='Nobody has sent a message on this server yet.', inline=False)
+
+        # send embed
+        await ctx.respond(embed=embed)
+
 
 # cog related functions
 def setup(client):
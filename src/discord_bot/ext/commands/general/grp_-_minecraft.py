@@ -4,8 +4,7 @@ import logging
 import dotenv
 import discord
 from discord.ext import commands
-from datetime import datetime, timedelta
-from requests_cache import CachedSession
+from datetime import datetime
 import math
 from re import findall
 
@@ -27,17 +26,8 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
     def __init__(self, client):
         self.client = client
 
-        self.cached_request_session = CachedSession(
-            'birb-bot_-_hypixel_request_cache',
-            use_cache_dir=True,                     # Save files in the default user cache dir
-            cache_control=True,                     # Use Cache-Control headers for expiration, if available
-            expire_after=timedelta(minutes=10),     # Otherwise, expire responses after ten minutes
-            allowable_methods=['GET', 'POST'],      # Cache POST requests to avoid sending the same data twice
-            allowable_codes=[200, 400],             # Cache 400 responses as a solemn reminder of your failures
-            ignored_parameters=['api_key', 'key'],  # Don't match this param or save it in the cache
-            match_headers=True,                     # Match all request headers
-            stale_if_error=True,                    # In case of request errors, use stale cache data if possible
-        )
+        # responses are cached for ten minutes, the stats do not change that fast
+        self.cache_ttl = 600    # seconds
 
     # TODO: Bridge groups not working
     @commands.group(name='render_skin', aliases=['renderskin', 'rnsn'],
@@ -52,9 +42,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
         """send a picture of a minecraft player's face"""
         try:
             async with ctx.typing():
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{player_name}'
-                uuid_data = self.cached_request_session.get(player_uuid_url).json()
-                player_uuid = uuid_data['id']
+                player_uuid = await self.client.uuid_resolver.get_uuid(player_name)
 
             await ctx.send(f'https://crafatar.com/avatars/{player_uuid}?size=128&overlay')
         except Exception as e:
@@ -66,9 +54,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
         """send a picture of a minecraft player's head"""
         try:
             async with ctx.typing():
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{player_name}'
-                uuid_data = self.cached_request_session.get(player_uuid_url).json()
-                player_uuid = uuid_data['id']
+                player_uuid = await self.client.uuid_resolver.get_uuid(player_name)
 
             await ctx.send(f'https://crafatar.com/renders/head/{player_uuid}?size=512&overlay')
         except Exception as e:
@@ -80,9 +66,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
         """send a picture of a minecraft player's body"""
         try:
             async with ctx.typing():
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{player_name}'
-                uuid_data = self.cached_request_session.get(player_uuid_url).json()
-                player_uuid = uuid_data['id']
+                player_uuid = await self.client.uuid_resolver.get_uuid(player_name)
 
             await ctx.send(f'https://crafatar.com/renders/body/{player_uuid}?size=512&overlay')
         except Exception as e:
@@ -117,10 +101,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
             embed.set_author(name=f'Requested by: {ctx.author}', icon_url=ctx.author.avatar.url)
 
             try:
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{hypixel_player_name}'
-                uuid_data = self.cached_request_session.get(player_uuid_url).json()
-
-                player_uuid = uuid_data['id']
+                player_uuid = await self.client.uuid_resolver.get_uuid(hypixel_player_name)
                 embed.add_field(name='UUID', value=f'UUID: {player_uuid}', inline=False)
                 embed.set_thumbnail(url=f"https://crafatar.com/avatars/{player_uuid}")
 
@@ -130,7 +111,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
 
                 try:
                     player_data_url = f'https://api.hypixel.net/player?key={hypixelApiKey}&uuid={player_uuid}'
-                    player_data = self.cached_request_session.get(player_data_url).json()
+                    player_data = await self.client.http_client.get_json(player_data_url, cache_ttl=self.cache_ttl)
 
                     if player_data['player'] is not None:
                         if 'rank' in player_data['player'] and player_data['player']['rank'] != 'NORMAL':
@@ -176,7 +157,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
 
                         try:
                             guild_url = f'https://api.hypixel.net/guild?player={player_uuid}&key={hypixelApiKey}'
-                            guild_data = self.cached_request_session.get(guild_url).json()
+                            guild_data = await self.client.http_client.get_json(guild_url, cache_ttl=self.cache_ttl)
 
                             if guild_data['guild'] is not None:
                                 guild_name = guild_data['guild']['name']
@@ -225,10 +206,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
             embed.set_author(name=f'Requested by: {ctx.author}', icon_url=ctx.author.avatar.url)
 
             try:
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{hypixel_player_name}'
-                uuid_data = self.cached_request_session.get(player_uuid_url).json()
-
-                player_uuid = uuid_data['id']
+                player_uuid = await self.client.uuid_resolver.get_uuid(hypixel_player_name)
                 embed.set_thumbnail(url=f'https://crafatar.com/avatars/{player_uuid}')
                 """
                 player-head-render as thumbnail: embed.set_thumbnail(url=f'https://crafatar.com/renders/head/{player_uuid}')
@@ -236,7 +214,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
 
                 try:
                     guild_url = f'https://api.hypixel.net/guild?key={hypixelApiKey}&player={player_uuid}'
-                    guild_data = self.cached_request_session.get(guild_url).json()
+                    guild_data = await self.client.http_client.get_json(guild_url, cache_ttl=self.cache_ttl)
 
                     if guild_data['guild'] is not None:
 
@@ -314,10 +292,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
             embed.set_author(name=f'Requested by: {ctx.author}', icon_url=ctx.author.avatar.url)
 
             try:
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{hypixel_player_name}'
-                uuid_data = self.cached_request_session.get(player_uuid_url).json()
-
-                player_uuid = uuid_data['id']
+                player_uuid = await self.client.uuid_resolver.get_uuid(hypixel_player_name)
                 embed.add_field(name='UUID', value=f'UUID: {player_uuid}', inline=False)
                 embed.set_thumbnail(url=f'https://crafatar.com/avatars/{player_uuid}')
 
@@ -327,7 +302,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
 
                 try:
                     player_data_url = f'https://api.hypixel.net/player?key={hypixelApiKey}&uuid={player_uuid}'
-                    player_data = self.cached_request_session.get(player_data_url).json()
+                    player_data = await self.client.http_client.get_json(player_data_url, cache_ttl=self.cache_ttl)
 
                     if player_data['player'] is not None:
                         try:
@@ -415,10 +390,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
             embed.set_author(name=f'Requested by: {ctx.author}', icon_url=ctx.author.avatar.url)
 
             try:
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{hypixel_player_name}'
-                uuid_data = self.cached_request_session.get(player_uuid_url).json()
-
-                player_uuid = uuid_data['id']
+                player_uuid = await self.client.uuid_resolver.get_uuid(hypixel_player_name)
                 embed.add_field(name='UUID', value=f'UUID: {player_uuid}', inline=False)
                 embed.set_thumbnail(url=f'https://crafatar.com/avatars/{player_uuid}')
 
@@ -428,7 +400,7 @@ class Minecraft(commands.Cog, name='Hypixel', description='contains hypixel rela
 
                 try:
                     player_data_url = f'https://api.hypixel.net/player?key={hypixelApiKey}&uuid={player_uuid}'
-                    player_data = self.cached_request_session.get(player_data_url).json()
+                    player_data = await self.client.http_client.get_json(player_data_url, cache_ttl=self.cache_ttl)
 
                     if player_data['player'] is not None:
                         try:
@@ -2,10 +2,14 @@
 import os
 import logging
 import dotenv
+import asyncio
 import discord
+from time import monotonic
 from datetime import datetime
 from discord.ext import commands, tasks
-import requests
+from http_client import HttpClient, HttpError
+from rate_limiter import TokenBucket
+from hycheck_schedule import PollSchedule
 
 # logging
 """create logger by inheriting configuration from root logger"""
@@ -18,6 +22,8 @@ dotenv.load_dotenv()
 
 embedColor = int(os.getenv('EMBED_COLOR'))
 hypixelApiKeyHycheck = os.getenv('HYPIXEL_API_KEY_HYCHECK')
+hypixelApiRateLimitHycheck = int(os.getenv('HYPIXEL_API_RATE_LIMIT_HYCHECK', 60))    # requests per minute
+hypixelApiBudgetHycheck = int(os.getenv('HYPIXEL_API_BUDGET_HYCHECK', hypixelApiRateLimitHycheck // 2))
 
 
 # extension
@@ -27,85 +33,266 @@ class Hycheck(commands.Cog, name='Hycheck',
     def __init__(self, client):
         self.client = client
 
-        self.request_session = requests.Session()
-
         self.channel = None
         self.ignore_exceptions = False
         self.friends = {}
 
+        # requests of a check cycle run concurrently, limited to the quota of the api key
+        self.rate_limiter = TokenBucket(hypixelApiRateLimitHycheck)
+        self.max_concurrency = 8
+        self.max_attempts = 2    # per player and cycle
+
+        # every player has their own next check time, the loop only checks the players that are due
+        self.schedule = PollSchedule(hypixelApiBudgetHycheck)
+
+        self.cycles = 0
+        self.last_cycle = None    # {'players': ..., 'requests': ..., 'rate_limited': ..., 'failed': ..., ...}
+
+        # the checklist and the loop configuration are restored from "databank.db" once the client is ready,
+        # right away if the extension is (re)loaded while the bot is running
+        self.restored = False
+        if client.is_ready():
+            client.loop.create_task(self.restore())
+
         # structure/ testing:
-        # self.friends = {'8159687be31a4cbda70d9a446b22dd5f': {'name': 'Fireboerd', 'status': 'offline'}}
+        # self.friends = {'8159687be31a4cbda70d9a446b22dd5f': {'name': 'Fireboerd', 'status': 'offline',
+        #                                                      'last_login': None, 'last_logout': None}}
+
+    # ------
+    # persistence
+    # ------
+
+    async def save_players(self, player_uuids):
+        """writes the checklist entries of the given players to "databank.db" (write-through)"""
+        await self.client.database.executemany(
+            """INSERT OR REPLACE INTO hycheck_player(player_uuid, name, status, last_login, last_logout)
+            VALUES(?, ?, ?, ?, ?)""",
+            [(player_uuid, self.friends[player_uuid]['name'], self.friends[player_uuid]['status'],
+              self.friends[player_uuid]['last_login'], self.friends[player_uuid]['last_logout'])
+             for player_uuid in player_uuids])
+
+    async def delete_players(self, player_uuids):
+        """deletes the checklist entries of the given players from "databank.db" (write-through)"""
+        await self.client.database.executemany("""DELETE FROM hycheck_player WHERE player_uuid = ?""",
+                                               [(player_uuid,) for player_uuid in player_uuids])
+
+    async def save_config(self, running):
+        """writes the output channel and the loop configuration to "databank.db" (write-through)"""
+        await self.client.database.execute(
+            """INSERT OR REPLACE INTO hycheck_config(id, channel_id, base_interval, ignore_exceptions, running)
+            VALUES(0, ?, ?, ?, ?)""",
+            (self.channel.id if self.channel is not None else None, self.schedule.base_interval,
+             int(self.ignore_exceptions), int(running)))
+
+    async def restore(self):
+        """restores the checklist and the loop configuration once and resumes the loop if it was running"""
+        if self.restored:
+            return
+
+        self.restored = True
+
+        config = await self.client.database.fetchone(
+            """SELECT channel_id, base_interval, ignore_exceptions, running FROM hycheck_config WHERE id = 0""")
+
+        # the configuration is applied first, the intervals of the restored players depend on the base interval
+        if config is not None:
+            channel_id, base_interval, ignore_exceptions, running = config
+
+            self.schedule.base_interval = base_interval
+            self.ignore_exceptions = bool(ignore_exceptions)
+
+            if channel_id is not None:
+                try:
+                    self.channel = self.client.get_channel(channel_id) or await self.client.fetch_channel(channel_id)
+
+                except discord.HTTPException as e:
+                    logger.warning(f'the hycheck channel {channel_id} is not available anymore: "{e}"')
+
+        rows = await self.client.database.fetchall(
+            """SELECT player_uuid, name, status, last_login, last_logout FROM hycheck_player""")
+
+        for player_uuid, name, status, last_login, last_logout in rows:
+            self.friends[player_uuid] = {'name': name, 'status': status,
+                                         'last_login': last_login, 'last_logout': last_logout}
+
+            # the known login history lets the schedule pick the right interval right away,
+            # the first checks are spread at the pace of the budget instead of all being due on the first cycle
+            self.schedule.add(player_uuid, player={'lastLogin': last_login, 'lastLogout': last_logout})
+
+        if config is not None and running and self.channel is not None and not self.get_online.is_running():
+            self.get_online.start()
+
+        logger.info(f'restored {len(rows)} players of the hycheck checklist')
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """restores the state when the bot starts, "databank.db" is only migrated after the extensions are loaded"""
+        await self.restore()
+
+    def cog_unload(self):
+        """stops the loop when the extension is unloaded, a reloaded cog resumes it from the stored state"""
+        self.get_online.cancel()
 
     # ------
     # check loop
     # ------
 
-    @tasks.loop(seconds=300)
-    async def get_online(self):
-        for player_uuid in self.friends.keys():
-            try:
-                player_data_url = f'https://api.hypixel.net/player?key={hypixelApiKeyHycheck}&uuid={player_uuid}'
-                player_data = self.request_session.get(player_data_url).json()
-
-                if player_data['player'] is not None:
-                    player_last_login = player_data['player']['lastLogin']
-                    player_last_logout = player_data['player']['lastLogout']
-
-                    if player_last_login > player_last_logout and self.friends[player_uuid]['status'] == 'offline':
-                        # the player is online and was offline before
-                        time = datetime.now()
-                        formatted_time = time.strftime('%H:%M')
-
-                        self.friends[player_uuid]['status'] = 'online'
-
-                        embed = discord.Embed(title=f'{self.friends[player_uuid]["name"]} is online!',
-                                              description=f'**{self.friends[player_uuid]["name"]}** '
-                                                          'is now **`online`** on the Hypixel network!',
-                                              color=discord.Color.dark_green())
-                        embed.set_footer(text=f'BerbBot - {formatted_time}')
-                        embed.set_author(name=f'{player_uuid}',
-                                         # from the Twitter account of the hypixel owner
-                                         icon_url='https://pbs.twimg.com/profile_images/'
-                                                  '1346968969849171970/DdNypQdN_400x400.png')
-                        embed.set_thumbnail(url=f'https://crafatar.com/avatars/{player_uuid}')
-
-                        await self.channel.send(embed=embed)
-
-                    elif player_last_login < player_last_logout and self.friends[player_uuid]['status'] == 'online':
-                        # the player is offline and was online before
-                        time = datetime.now()
-                        formatted_time = time.strftime('%H:%M')
-
-                        self.friends[player_uuid]['status'] = 'offline'
-
-                        embed = discord.Embed(title=f'{self.friends[player_uuid]["name"]} is offline!',
-                                              description=f'**{self.friends[player_uuid]["name"]}** '
-                                                          'is now **`offline`** and left the Hypixel network!',
-                                              color=discord.Color.orange())
-                        embed.set_footer(text=f'BerbBot - {formatted_time}')
-                        embed.set_author(name=f'{player_uuid}',
-                                         # from the Twitter account of the hypixel owner
-                                         icon_url='https://pbs.twimg.com/profile_images/' 
-                                                  '1346968969849171970/DdNypQdN_400x400.png')
-                        embed.set_thumbnail(url=f'https://crafatar.com/avatars/{player_uuid}')
-
-                        await self.channel.send(embed=embed)
+    @staticmethod
+    def get_header_int(headers, name):
+        """returns the value of a numeric header, or None if it is missing"""
+        try:
+            return int(headers[name])
 
-                else:
-                    del self.friends[player_uuid]
-                    await self.channel.send(f'The player {self.friends[player_uuid]["name"]} never played on hypixel '
-                                            'and was therefore removed from the checklist')
+        except (KeyError, ValueError):
+            return None
 
-            except Exception as e:
-                logger.exception(e)
+    async def request_player(self, player_uuid, cycle):
+        """requests the data of a player within the rate limit of the api key, None if they never played on hypixel
+
+        rate limited and failed requests are tried again until "max_attempts" is reached
+        """
+        player_data_url = f'https://api.hypixel.net/player?key={hypixelApiKeyHycheck}&uuid={player_uuid}'
+
+        for attempt in range(self.max_attempts):
+            await self.rate_limiter.acquire()
+            cycle['requests'] += 1
+
+            try:
+                # retries are done here, so every attempt takes a token from the rate limiter
+                response = await self.client.http_client.request('GET', player_data_url, retries=0)
+
+            except HttpError as e:
+                if (e.status != 429 and e.status < 500) or attempt == self.max_attempts - 1:
+                    raise
+
+                if e.status == 429:
+                    # the quota is used up, wait until the api resets it
+                    cycle['rate_limited'] += 1
+                    reset = self.get_header_int(e.headers, 'RateLimit-Reset')
+                    self.rate_limiter.block(HttpClient.get_retry_after(e.headers, reset if reset else 60))
+
+                continue
+
+            self.rate_limiter.update(self.get_header_int(response.headers, 'RateLimit-Remaining'),
+                                     self.get_header_int(response.headers, 'RateLimit-Reset'))
+
+            return response.data['player']
+
+    async def check_player(self, player_uuid, semaphore, cycle):
+        """requests the status of a player and sends a message if it changed"""
+        async with semaphore:
+            player = await self.request_player(player_uuid, cycle)
+
+        friend = self.friends.get(player_uuid)
+        if friend is None:
+            # the player was removed from the checklist while the request was running
+            return
+
+        if player is not None:
+            self.schedule.update(player_uuid, player)
+
+            player_last_login = player['lastLogin']
+            player_last_logout = player['lastLogout']
+            previous_status = friend['status']
+
+            if player_last_login > player_last_logout and friend['status'] == 'offline':
+                friend['status'] = 'online'
+            elif player_last_login < player_last_logout and friend['status'] == 'online':
+                friend['status'] = 'offline'
+
+            if (player_last_login, player_last_logout) != (friend['last_login'], friend['last_logout']) \
+                    or friend['status'] != previous_status:
+                friend['last_login'] = player_last_login
+                friend['last_logout'] = player_last_logout
+
+                # the new status is stored before the message is sent, so it is not sent again after a restart
+                await self.save_players([player_uuid])
+
+            if friend['status'] == 'online' and previous_status == 'offline':
+                # the player is online and was offline before
+                time = datetime.now()
+                formatted_time = time.strftime('%H:%M')
+
+                embed = discord.Embed(title=f'{friend["name"]} is online!',
+                                      description=f'**{friend["name"]}** '
+                                                  'is now **`online`** on the Hypixel network!',
+                                      color=discord.Color.dark_green())
+                embed.set_footer(text=f'BerbBot - {formatted_time}')
+                embed.set_author(name=f'{player_uuid}',
+                                 # from the Twitter account of the hypixel owner
+                                 icon_url='https://pbs.twimg.com/profile_images/'
+                                          '1346968969849171970/DdNypQdN_400x400.png')
+                embed.set_thumbnail(url=f'https://crafatar.com/avatars/{player_uuid}')
+
+                await self.channel.send(embed=embed)
+
+            elif friend['status'] == 'offline' and previous_status == 'online':
+                # the player is offline and was online before
+                time = datetime.now()
+                formatted_time = time.strftime('%H:%M')
+
+                embed = discord.Embed(title=f'{friend["name"]} is offline!',
+                                      description=f'**{friend["name"]}** '
+                                                  'is now **`offline`** and left the Hypixel network!',
+                                      color=discord.Color.orange())
+                embed.set_footer(text=f'BerbBot - {formatted_time}')
+                embed.set_author(name=f'{player_uuid}',
+                                 # from the Twitter account of the hypixel owner
+                                 icon_url='https://pbs.twimg.com/profile_images/'
+                                          '1346968969849171970/DdNypQdN_400x400.png')
+                embed.set_thumbnail(url=f'https://crafatar.com/avatars/{player_uuid}')
+
+                await self.channel.send(embed=embed)
+
+        else:
+            del self.friends[player_uuid]
+            self.schedule.remove(player_uuid)
+            await self.delete_players([player_uuid])
+            await self.channel.send(f'The player {friend["name"]} never played on hypixel '
+                                    'and was therefore removed from the checklist')
 
-                if not self.ignore_exceptions:
-                    self.get_online.cancel()
+    @tasks.loop(seconds=10)
+    async def get_online(self):
+        """checks the players that are due concurrently, within the rate limit of the api key"""
+        due = self.schedule.pop_due()
+        if not due:
+            return
+
+        started_at = monotonic()
+        cycle = {'players': len(due), 'requests': 0, 'rate_limited': 0, 'failed': 0}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        results = await asyncio.gather(*(self.check_player(player_uuid, semaphore, cycle) for player_uuid in due),
+                                       return_exceptions=True)
+        errors = []
+
+        for player_uuid, result in zip(due, results):
+            if isinstance(result, Exception):
+                # check the player again after their current interval
+                self.schedule.update(player_uuid)
+                errors.append(result)
+
+        cycle['failed'] = len(errors)
+        cycle['duration'] = monotonic() - started_at
+        self.cycles += 1
+        self.last_cycle = cycle
+
+        logger.info(f'checked {cycle["players"]} players in {cycle["duration"]:.2f}s '
+                    f'with {cycle["requests"]} requests '
+                    f'({cycle["rate_limited"]} rate limited, {cycle["failed"]} failed)')
+
+        for error in errors:
+            logger.error(error, exc_info=error)
+
+        if errors and not self.ignore_exceptions:
+            # stopping instead of cancelling, so the message below is still sent
+            self.get_online.stop()
+            await self.save_config(running=False)
 
-                    await self.channel.send(
-                        'An API-Error occurred. The online check loop has been stopped.\n'
-                        'You may want to disable this feature using the "ignore_exceptions" command.\n\n'
-                        f'**Error:** {e}')
+            await self.channel.send(
+                'An API-Error occurred. The online check loop has been stopped.\n'
+                'You may want to disable this feature using the "ignore_exceptions" command.\n\n'
+                f'**Error:** {errors[0]}')
 
     # ------
     # commands
@@ -125,23 +312,24 @@ class Hycheck(commands.Cog, name='Hycheck',
     @commands.is_owner()
     async def toggle_ignore_exceptions(self, ctx: commands.Context):
         """the loop keeps going, even if errors occur; errors will not be printed out for you"""
-        if self.ignore_exceptions:
-            self.ignore_exceptions = False
+        self.ignore_exceptions = not self.ignore_exceptions
+        await self.save_config(running=self.get_online.is_running())
+
+        if not self.ignore_exceptions:
             await ctx.send(f'Exceptions will no longer be ignored.')
         else:
-            self.ignore_exceptions = True
             await ctx.send(f'From now on, exceptions will be ignored.')
 
     @hycheck.command(name='set_interval', aliases=['setinterval', 'change_interval', 'changeinterval'],
-                     description='changes the interval of the check loop to the given time interval')
+                     description='changes the interval offline players are checked at to the given time interval;\n'
+                                 'it is adapted to the login history of each player')
     @commands.is_owner()
     async def set_interval(self, ctx: commands.Context, hours: float, minutes: float, seconds: float):
-        """changes the interval of the check loop"""
-        self.get_online.change_interval(seconds=seconds, minutes=minutes, hours=hours)
-        await ctx.send('The interval of the online check loop has been set to: '
-                       f'**`{self.get_online.hours}` hours, '
-                       f'`{self.get_online.minutes}` minutes, '
-                       f'`{self.get_online.seconds}` seconds**.')
+        """changes the base interval of the check schedule"""
+        self.schedule.base_interval = max(self.schedule.min_interval, hours * 3600 + minutes * 60 + seconds)
+        await self.save_config(running=self.get_online.is_running())
+        await ctx.send('The base interval of the online check schedule has been set to: '
+                       f'**`{self.schedule.base_interval}` seconds**.')
 
     @hycheck.command(name='start_requests', aliases=['startrequests'],
                      description='starts the online check loop')
@@ -155,6 +343,7 @@ class Hycheck(commands.Cog, name='Hycheck',
         if not self.get_online.is_running():
             self.channel = ctx.channel
             self.get_online.start()
+            await self.save_config(running=True)
 
             embed = discord.Embed(title='Started!',
                                   description='The online check loop has been started.',
@@ -184,6 +373,7 @@ class Hycheck(commands.Cog, name='Hycheck',
 
         if self.get_online.is_running():
             self.get_online.stop()
+            await self.save_config(running=False)
 
             embed = discord.Embed(title='Stopping!',
                                   description='The online check loop is now stopping.',
@@ -212,6 +402,7 @@ class Hycheck(commands.Cog, name='Hycheck',
 
         if self.get_online.is_running():
             self.get_online.cancel()
+            await self.save_config(running=False)
 
             embed = discord.Embed(title='Stopped!',
                                   description='The online check loop has been stopped forcefully.',
@@ -238,12 +429,12 @@ class Hycheck(commands.Cog, name='Hycheck',
 
         if player_name not in [data['name'] for data in [dataset for dataset in self.friends.values()]]:
             try:
-                player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{player_name}'
-                uuid_data = self.request_session.get(player_uuid_url).json()
-
-                player_uuid = str(uuid_data['id'])
+                player_uuid = await self.client.uuid_resolver.get_uuid(player_name)
 
-                self.friends[player_uuid] = {'name': player_name, 'status': 'offline'}
+                self.friends[player_uuid] = {'name': player_name, 'status': 'offline',
+                                             'last_login': None, 'last_logout': None}
+                self.schedule.add(player_uuid)
+                await self.save_players([player_uuid])
                 await ctx.send(f'`{player_name}` has successfully been added to the online checklist!')
 
             except Exception as e:
@@ -258,28 +449,41 @@ class Hycheck(commands.Cog, name='Hycheck',
                      description='adds multiple friends to the checklist for the next time the check is executed')
     @commands.is_owner()
     async def add_friends(self, ctx: commands.Context, *, player_names: str):
-        player_name_list = player_names.split()
+        player_name_list = [str(player_name).strip() for player_name in player_names.split()]
+        listed_player_names = {data['name'] for data in self.friends.values()}
 
-        for player_name in player_name_list:
-            player_name = str(player_name).strip()
+        # all new names are resolved together, ten names per request
+        try:
+            player_uuids = await self.client.uuid_resolver.get_uuids(
+                [player_name for player_name in player_name_list if player_name not in listed_player_names])
 
-            if player_name not in [data['name'] for data in [dataset for dataset in self.friends.values()]]:
-                try:
-                    player_uuid_url = f'https://api.mojang.com/users/profiles/minecraft/{player_name}'
-                    uuid_data = self.request_session.get(player_uuid_url).json()
+        except Exception as e:
+            logger.exception(e)
+            await ctx.send('An API-Error occurred, the players were not added to the online checklist.')
+            return
 
-                    player_uuid = str(uuid_data['id'])
+        added_player_uuids = []
 
-                    self.friends[player_uuid] = {'name': player_name, 'status': 'offline'}
-                    await ctx.send(f'`{player_name}` has successfully been added to the online checklist!')
+        for player_name in player_name_list:
+            if player_name in listed_player_names:
+                await ctx.send(f'`{player_name}` is already in the online checklist.')
 
-                except Exception as e:
-                    logger.exception(e)
-                    await ctx.send(f'The player "{player_name}" does not exist '
-                                   'and was therefore not added to the online checklist.')
+            elif player_uuids[player_name] is None:
+                await ctx.send(f'The player "{player_name}" does not exist '
+                               'and was therefore not added to the online checklist.')
 
             else:
-                await ctx.send(f'`{player_name}` is already in the online checklist.')
+                player_uuid = player_uuids[player_name]
+
+                self.friends[player_uuid] = {'name': player_name, 'status': 'offline',
+                                             'last_login': None, 'last_logout': None}
+                self.schedule.add(player_uuid)
+                listed_player_names.add(player_name)
+                added_player_uuids.append(player_uuid)
+                await ctx.send(f'`{player_name}` has successfully been added to the online checklist!')
+
+        if added_player_uuids:
+            await self.save_players(added_player_uuids)
 
     @hycheck.command(name='remove_friend', aliases=['removefriend'],
                      description='removes a friend to the checklist for the next time the check is executed')
@@ -289,6 +493,8 @@ class Hycheck(commands.Cog, name='Hycheck',
         for player_uuid, player_data in self.friends.items():
             if player_data['name'] == player_name:
                 del self.friends[player_uuid]
+                self.schedule.remove(player_uuid)
+                await self.delete_players([player_uuid])
                 await ctx.send(f'`{player_name}` has successfully been removed from the online checklist!')
                 break
 
@@ -313,6 +519,8 @@ class Hycheck(commands.Cog, name='Hycheck',
 
             if player_to_remove:
                 del self.friends[player_to_remove]
+                self.schedule.remove(player_to_remove)
+                await self.delete_players([player_to_remove])
                 await ctx.send(f'`{player_name}` has successfully been removed from the online checklist!')
 
     @hycheck.command(name='checklist',
@@ -354,6 +562,55 @@ class Hycheck(commands.Cog, name='Hycheck',
 
         await ctx.send(embed=embed)
 
+    @hycheck.command(name='stats', description='sends the request counts and the duration of the last check cycle')
+    @commands.is_owner()
+    async def stats(self, ctx: commands.Context):
+        """sends the request counts and the duration of the last check cycle"""
+        global embedColor
+        time = datetime.now()
+        formatted_time = time.strftime('%H:%M')
+
+        embed = discord.Embed(title='Hycheck Statistics',
+                              description='requests of the online check loop\n',
+                              color=embedColor)
+        embed.set_author(name=f'Requested by: {ctx.author}',
+                         icon_url=ctx.author.avatar.url)
+        embed.set_footer(text=f'BerbBot - {formatted_time}')
+
+        # add content
+        if self.last_cycle is not None:
+            embed.add_field(name='Last Cycle',
+                            value=f'Players: `{self.last_cycle["players"]}`\n'
+                                  f'Requests: `{self.last_cycle["requests"]}`\n'
+                                  f'Rate Limited: `{self.last_cycle["rate_limited"]}`\n'
+                                  f'Failed: `{self.last_cycle["failed"]}`\n'
+                                  f'Duration: `{self.last_cycle["duration"]:.2f}s`',
+                            inline=True)
+        else:
+            embed.add_field(name='Last Cycle', value='The online check loop has not run yet.', inline=True)
+
+        limiter_stats = self.rate_limiter.stats()
+        embed.add_field(name='Rate Limiter',
+                        value=f'Limit: `{limiter_stats["rate"]}/{limiter_stats["period"]}s`\n'
+                              f'Available: `{limiter_stats["tokens"]}`\n'
+                              f'Requests: `{limiter_stats["acquired"]}`\n'
+                              f'Waited: `{limiter_stats["waited"]:.1f}s`\n'
+                              f'Blocked: `{limiter_stats["blocked"]}`\n'
+                              f'Cycles: `{self.cycles}`',
+                        inline=True)
+
+        schedule_stats = self.schedule.stats()
+        next_check = f'`{schedule_stats["next_check"]:.0f}s`' if schedule_stats['next_check'] is not None else '-'
+        embed.add_field(name='Schedule',
+                        value=f'Players: `{schedule_stats["players"]}` (`{schedule_stats["online"]}` online)\n'
+                              f'Requests per Minute: `{schedule_stats["demand"]:.1f}`\n'
+                              f'Budget: `{schedule_stats["budget"]}` per minute\n'
+                              f'Intervals Stretched: `{schedule_stats["scale"]:.2f}x`\n'
+                              f'Next Check: {next_check}',
+                        inline=False)
+
+        await ctx.send(embed=embed)
+
 
 # cog related functions
 def setup(client):
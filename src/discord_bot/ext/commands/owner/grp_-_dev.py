@@ -99,6 +99,9 @@ class Development(commands.Cog, name='Development', description='contains develo
             self.client.load_extension(f'ext.{extension_name[:-3]}')
             logger.info(f'successfully reloaded extension <{extension_name}>')
 
+            # the help pages list the commands of the extensions, render them again
+            self.client.help_command.render_cache(self.client)
+
             # send embed
             embed = discord.Embed(title=f'Reloaded',
                                   description=f'`{extension_name}` has been reloaded successfully!',
@@ -139,6 +142,9 @@ class Development(commands.Cog, name='Development', description='contains develo
             self.client.load_extension(f'ext.{extension_name[:-3]}')
             logger.info(f'successfully loaded extension <{extension_name}>')
 
+            # the help pages list the commands of the extensions, render them again
+            self.client.help_command.render_cache(self.client)
+
             # send embed
             embed = discord.Embed(title=f'Loaded',
                                   description=f'`{extension_name}` has been loaded successfully!',
@@ -179,6 +185,9 @@ class Development(commands.Cog, name='Development', description='contains develo
             self.client.unload_extension(f'ext.{extension_name[:-3]}')
             logger.info(f'successfully unloaded extension <{extension_name}>')
 
+            # the help pages list the commands of the extensions, render them again
+            self.client.help_command.render_cache(self.client)
+
             # send embed
             embed = discord.Embed(title=f'Unloaded',
                                   description=f'`{extension_name}` has been unloaded successfully!',
@@ -206,6 +215,105 @@ class Development(commands.Cog, name='Development', description='contains develo
 
             await ctx.send(embed=embed)
 
+    @dev.command(name='cache_stats', aliases=['cachestats'], description='sends the hit/ miss counters of the caches')
+    @commands.is_owner()
+    async def cache_stats(self, ctx: commands.Context):
+        """sends the hit/ miss counters of the caches"""
+        global embedColor
+        time = datetime.now()
+        formatted_time = time.strftime('%H:%M')
+
+        embed = discord.Embed(title='Cache Statistics',
+                              description='hit/ miss counters of the caches\n',
+                              color=embedColor)
+        embed.set_author(name=f'Requested by: {ctx.author}',
+                         icon_url=ctx.author.avatar.url)
+        embed.set_footer(text=f'BerbBot - {formatted_time}')
+
+        # add content
+        prefix_cache_stats = self.client.prefix_cache.stats()
+        embed.add_field(name='Prefix Cache',
+                        value=f'Guilds: `{prefix_cache_stats["guilds"]}`\n'
+                              f'Hits: `{prefix_cache_stats["hits"]}`\n'
+                              f'Misses: `{prefix_cache_stats["misses"]}`\n'
+                              f'Matcher Builds: `{prefix_cache_stats["matcher_builds"]}`\n'
+                              f'Hit Rate: `{prefix_cache_stats["hit_rate"]:.2%}`',
+                        inline=False)
+
+        uuid_resolver_stats = self.client.uuid_resolver.stats()
+        embed.add_field(name='Player UUID Cache',
+                        value=f'Cached Names: `{uuid_resolver_stats["cached"]}`\n'
+                              f'Memory Hits: `{uuid_resolver_stats["memory_hits"]}`\n'
+                              f'Database Hits: `{uuid_resolver_stats["database_hits"]}`\n'
+                              f'Coalesced Lookups: `{uuid_resolver_stats["coalesced"]}`\n'
+                              f'Bulk Requests: `{uuid_resolver_stats["requests"]}` '
+                              f'(`{uuid_resolver_stats["fetched"]}` names)',
+                        inline=False)
+
+        await ctx.send(embed=embed)
+
+    @dev.command(name='db_stats', aliases=['dbstats'], description='sends the latency of the slowest database queries')
+    @commands.is_owner()
+    async def db_stats(self, ctx: commands.Context):
+        """sends the latency of the slowest database queries"""
+        global embedColor
+        time = datetime.now()
+        formatted_time = time.strftime('%H:%M')
+
+        embed = discord.Embed(title='Database Statistics',
+                              description='per-query latency of the queries sent to "databank.db"\n',
+                              color=embedColor)
+        embed.set_author(name=f'Requested by: {ctx.author}',
+                         icon_url=ctx.author.avatar.url)
+        embed.set_footer(text=f'BerbBot - {formatted_time}')
+
+        # add content, only show the slowest queries (embeds can not have more than 25 fields)
+        query_stats = self.client.database.stats()
+
+        for stats in query_stats[:10]:
+            embed.add_field(name=stats['query'][:256],
+                            value=f'Count: `{stats["count"]}`\n'
+                                  f'Average: `{stats["average"] * 1000:.2f}ms`\n'
+                                  f'Max: `{stats["max"] * 1000:.2f}ms`',
+                            inline=False)
+
+        if not query_stats:
+            embed.add_field(name='Queries', value='No queries have been executed yet.', inline=False)
+
+        await ctx.send(embed=embed)
+
+    @dev.command(name='http_stats', aliases=['httpstats'], description='sends the counters of the shared http client')
+    @commands.is_owner()
+    async def http_stats(self, ctx: commands.Context):
+        """sends the counters of the shared http client"""
+        global embedColor
+        time = datetime.now()
+        formatted_time = time.strftime('%H:%M')
+
+        embed = discord.Embed(title='HTTP Statistics',
+                              description='requests sent to external apis\n',
+                              color=embedColor)
+        embed.set_author(name=f'Requested by: {ctx.author}',
+                         icon_url=ctx.author.avatar.url)
+        embed.set_footer(text=f'BerbBot - {formatted_time}')
+
+        # add content
+        http_stats = self.client.http_client.stats()
+        embed.add_field(name='HTTP Client',
+                        value=f'Requests: `{http_stats["requests"]}`\n'
+                              f'Retried: `{http_stats["retried"]}`\n'
+                              f'Failed: `{http_stats["failed"]}`\n'
+                              f'Cache Hits: `{http_stats["cache_hits"]}`\n'
+                              f'Cached Responses: `{http_stats["cache_size"]}`',
+                        inline=False)
+
+        hosts = '\n'.join(f'{host}: `{requests}`' for host, requests in list(http_stats['hosts'].items())[:10])
+        embed.add_field(name='Requests per Host',
+                        value=hosts if hosts else 'No requests have been sent yet.',
+                        inline=False)
+
+        await ctx.send(embed=embed)
+
     @bridge.bridge_command(name='test_embed', aliases=['testembed'],
                            description='sends an embed, therefore tests the bots functionality')
     async def test_embed(self, ctx: bridge.BridgeContext):
@@ -4,9 +4,12 @@ import logging
 import dotenv
 import discord
 from datetime import datetime
-from discord.ext import commands, bridge
+from discord.ext import commands, bridge, tasks
 from discord.commands import Option
-from youtube_dl import YoutubeDL
+from music_resolver import YoutubeResolver
+from music_player import PlayerRegistry, PAUSED
+from music_queue import Track, format_duration
+from music_disk_cache import AudioDiskCache
 
 # logging
 """create logger by inheriting configuration from root logger"""
@@ -25,10 +28,7 @@ class Music(commands.Cog, name='Music', description='contains commands for playi
     def __init__(self, client):
         self.client = client
 
-        self.voice_client = None
-
-        self.music_queue = []    # [[{'source': url, 'title': title}, channel], ...]
-        self.volume = 1.0    # floating point percentage
+        self.queue_page_size = 10    # songs per page of display_queue
 
         self.valid_file_types = [
             '.mp3',
@@ -44,85 +44,57 @@ class Music(commands.Cog, name='Music', description='contains commands for playi
             'options': '-vn'
         }
 
-    def search_yt(self, query):
-        """searches YouTube for a query and returns playback url and title if successful, else False"""
-        with YoutubeDL(self.YDL_OPTIONS) as ydl:
-            try:
-                info = ydl.extract_info('ytsearch:%s' % query, download=False)['entries'][0]
-                return {'source': info['formats'][0]['url'], 'title': info['title']}
-
-            except Exception as e:
-                logger.exception(e)
-                return False
-
-    def play_next(self):
-        """plays the next song in the queue; if no songs are queued, nothing will be played"""
-        if self.music_queue:
-            # get the first item (url) in the queue
-            source = self.music_queue[0][0]['source']
-            # then remove it from the queue, so it won't be played forever
-            self.music_queue.pop(0)
-
-            if self.voice_client.is_connected():    # only try playing if the voice client is connected (recursion)
-
-                # do not try to reconnect to a stream when playing local files
-                if source.startswith('http://') or source.startswith('https://'):
-                    self.voice_client.play(
-                        discord.PCMVolumeTransformer(
-                            discord.FFmpegPCMAudio(source, **self.FFMPEG_OPTIONS),
-                            self.volume
-                        ),
-                        after=lambda e: self.play_next()    # recursion using lambda
-                    )
+        # YouTube searches run on a bounded thread pool, so they do not block the bot
+        self.resolver = YoutubeResolver(self.YDL_OPTIONS)
 
-                else:
-                    self.voice_client.play(
-                        discord.PCMVolumeTransformer(
-                            discord.FFmpegPCMAudio(source),
-                            self.volume
-                        ),
-                        after=lambda e: self.play_next()    # recursion using lambda
-                    )
-
-    async def play_music(self, ctx):
-        """"""
-        if self.music_queue:
-            # get the first item (url) in the queue
-            source = self.music_queue[0][0]['source']
-
-            # try to connect to voice channel if you are not already connected
-            if not self.voice_client or not self.voice_client.is_connected():
-                self.voice_client = await self.music_queue[0][1].connect()
-                # can not connect
-                if not self.voice_client:
-                    await ctx.respond(f'{ctx.author.mention}, I was not able to connect to the given voice channel.\n'
-                                      f'(Voice Channel: `{self.music_queue[0][1]}`)')
-                    return
+        # the most played tracks are kept as opus files, so they do not have to be downloaded and decoded again
+        self.disk_cache = AudioDiskCache('../../data/audio_cache')
+        self.disk_cache.load()
 
-            else:
-                await self.voice_client.move_to(self.music_queue[0][1])
+        # every guild gets its own voice client, queue and volume
+        self.players = PlayerRegistry(self.client, self.resolver, self.FFMPEG_OPTIONS, self.disk_cache)
+        self.reclaim_idle_players.start()
 
-            # then remove the first item (url) in the queue, so it won't be played forever
-            self.music_queue.pop(0)
+    def cog_unload(self):
+        """stop the reclaim loop, leave all voice channels and shut down the resolver threads"""
+        self.reclaim_idle_players.cancel()
+        self.client.loop.create_task(self.players.close())
+        self.resolver.close()
 
-            # do not try to reconnect to a stream when playing local files
-            if source.startswith('http://') or source.startswith('https://'):
-                self.voice_client.play(
-                    discord.PCMVolumeTransformer(
-                        discord.FFmpegPCMAudio(source, **self.FFMPEG_OPTIONS),
-                        self.volume
-                    ),
-                    after=lambda e: self.play_next()
-                )
+    @tasks.loop(seconds=60)
+    async def reclaim_idle_players(self):
+        """disconnects and removes the players of guilds that have not used them for a while"""
+        await self.players.reclaim_idle()
 
-            else:
-                self.voice_client.play(
-                    discord.PCMVolumeTransformer(
-                        discord.FFmpegPCMAudio(source),
-                        self.volume
-                    ),
-                    after=lambda e: self.play_next()
-                )
+    async def import_playlist(self, ctx, player, url):
+        """appends all entries of a playlist to the queue at once and resolves them in the background"""
+        # acknowledge at once, listing the playlist can take a few seconds
+        await ctx.respond('Importing the playlist...')
+        entries = await self.resolver.list_playlist(url)
+
+        if not entries:
+            await ctx.edit(content=f'{ctx.author.mention}, I was not able to import the given playlist. '
+                                   'Maybe it is private or empty.')
+            return
+
+        # placeholders are resolved when they are played at the latest
+        tracks = [Track(None, entry['title'], ctx.author.voice.channel, entry['id'], entry['duration'])
+                  for entry in entries]
+        for track in tracks:
+            player.queue.append(track)
+
+        await ctx.edit(content=f'Appended **{len(tracks)}** songs from the playlist to the queue.')
+
+        # start playing as soon as the first entry is resolved, the others are resolved concurrently meanwhile
+        player.start_import(tracks[1:])
+        await self.resolver.refresh(tracks[0])
+
+        if player.state == PAUSED:
+            # resume if paused
+            player.resume()
+
+        else:
+            await player.play(ctx)
 
     # ------
     # play_local
@@ -132,6 +104,8 @@ class Music(commands.Cog, name='Music', description='contains commands for playi
     @commands.guild_only()
     @commands.is_owner()
     async def play_local(self, ctx: bridge.BridgeContext, *, path_to_audio_file: str):
+        player = self.players.get(ctx.guild.id)
+
         if not ctx.author.voice.channel:
             # you need to be connected so that the bot knows where to go
             await ctx.respond(
@@ -139,22 +113,18 @@ class Music(commands.Cog, name='Music', description='contains commands for playi
 
         else:
             if os.path.exists(path_to_audio_file) and os.path.splitext(path_to_audio_file)[-1] in self.valid_file_types:
-                song = {'source': path_to_audio_file, 'title': os.path.basename(path_to_audio_file)}
+                track = Track(path_to_audio_file, os.path.basename(path_to_audio_file), ctx.author.voice.channel)
 
-                self.music_queue.append([song, ctx.author.voice.channel])
-                await ctx.respond(f'Appended to the queue: **{song["title"]}**')
+                player.queue.append(track)
+                player.schedule_prefetch()
+                await ctx.respond(f'Appended to the queue: **{track.title}**')
 
-                if self.voice_client:
-                    if self.voice_client.is_paused():
-                        # resume if paused
-                        await self.resume(ctx)
-                    elif self.voice_client.is_playing():
-                        pass
+                if player.state == PAUSED:
+                    # resume if paused
+                    player.resume()
 
-                    else:
-                        await self.play_music(ctx)
                 else:
-                    await self.play_music(ctx)
+                    await player.play(ctx)
 
             else:
                 await ctx.respond(f'{ctx.author.mention}, I was not able to find a valid audio file '
@@ -164,128 +134,135 @@ class Music(commands.Cog, name='Music', description='contains commands for playi
     # play, resume, pause, stop
     # ------
 
-    @bridge.bridge_command(name='play', help='appends the soundtrack of a youtube video to the queue and starts playing'
-                           )
+    @bridge.bridge_command(name='play', help='appends the soundtrack of a youtube video or of all videos of a youtube '
+                                             'playlist to the queue and starts playing')
     @commands.guild_only()
     async def play(self, ctx: bridge.BridgeContext, *, query: str):
+        player = self.players.get(ctx.guild.id)
+
         if not ctx.author.voice.channel:
             # you need to be connected so that the bot knows where to go
             await ctx.respond(f'{ctx.author.mention}, you need to be connected to a voice channel, to use this command!'
                               )
 
+        elif self.resolver.is_playlist(query):
+            await self.import_playlist(ctx, player, query)
+
         else:
-            song = self.search_yt(query)
+            # acknowledge at once, the search can take a few seconds
+            await ctx.respond(f'Searching for **{query}**...')
+            song = await self.resolver.search(query)
 
             if song:
-                self.music_queue.append([song, ctx.author.voice.channel])
-                await ctx.respond(f'Appended to the queue: **{song["title"]}**')
-
-                if self.voice_client:
-                    if self.voice_client.is_paused():
-                        # resume if paused
-                        await self.resume(ctx)
-                    elif self.voice_client.is_playing():
-                        pass
-
-                    else:
-                        await self.play_music(ctx)
+                player.queue.append(Track.from_song(song, ctx.author.voice.channel))
+                player.schedule_prefetch()
+                await ctx.edit(content=f'Appended to the queue: **{song["title"]}**')
+
+                if player.state == PAUSED:
+                    # resume if paused
+                    player.resume()
+
                 else:
-                    await self.play_music(ctx)
+                    await player.play(ctx)
 
             else:
-                await ctx.respond(f'{ctx.author.mention}, I was not able to find a YouTube video corresponding to '
-                                  'the given search query. Maybe it is a livestream or playlist. I can not play those.')
+                await ctx.edit(content=f'{ctx.author.mention}, I was not able to find a YouTube video corresponding to '
+                                       'the given search query. Maybe it is a livestream or playlist. '
+                                       'I can not play those.')
 
     @bridge.bridge_command(name='resume', help='if the bot has been paused, start playing from where it did')
     @commands.guild_only()
     async def resume(self, ctx: bridge.BridgeContext):
-        if self.voice_client:
-            if self.voice_client.is_paused():
-                self.voice_client.resume()
+        player = self.players.get(ctx.guild.id)
+
+        player.resume()
 
     @bridge.bridge_command(name='pause', help='if the bot is currently playing, pause it')
     @commands.guild_only()
     async def pause(self, ctx: bridge.BridgeContext):
-        if self.voice_client:
-            if self.voice_client.is_playing():
-                self.voice_client.pause()
+        player = self.players.get(ctx.guild.id)
+
+        player.pause()
 
     @bridge.bridge_command(name='stop', help='make the bot stop playing any music, '
                                              'clear the queue and leave the voice channel')
     @commands.guild_only()
     async def stop(self, ctx: bridge.BridgeContext):
-        if self.voice_client:
-            if self.voice_client.is_playing():
-                self.voice_client.stop()
-
-        self.music_queue = []
+        player = self.players.peek(ctx.guild.id)
 
-        await self.voice_client.disconnect()
+        if player:
+            await player.disconnect()
 
     # ------
-    # queue, skip, clear_queue, display_queue
+    # queue, skip, clear_queue, display_queue, remove_track, move_track, shuffle_queue
     # ------
 
     @bridge.bridge_command(name='queue', help='appends the soundtrack of a youtube video to the queue')
     @commands.guild_only()
     async def queue(self, ctx: bridge.BridgeContext, *, query: str):
+        player = self.players.get(ctx.guild.id)
+
         if not ctx.author.voice.channel:
             # you need to be connected so that the bot knows where to go
             await ctx.respond(f'{ctx.author.mention}, you need to be connected to a voice channel, to use this command!')
 
         else:
-            song = self.search_yt(query)
+            # acknowledge at once, the search can take a few seconds
+            await ctx.respond(f'Searching for **{query}**...')
+            song = await self.resolver.search(query)
 
             if isinstance(song, bool):
-                await ctx.respond(f'{ctx.author.mention}, I was not able to find a YouTube video corresponding to '
-                                  'the given search query. Maybe it is a livestream or playlist. I can not play those.')
+                await ctx.edit(content=f'{ctx.author.mention}, I was not able to find a YouTube video corresponding to '
+                                       'the given search query. Maybe it is a livestream or playlist. '
+                                       'I can not play those.')
 
             else:
-                self.music_queue.append([song, ctx.author.voice.channel])
-                await ctx.respond(f'Appended to the queue: **{song["title"]}**')
+                player.queue.append(Track.from_song(song, ctx.author.voice.channel))
+                player.schedule_prefetch()
+                await ctx.edit(content=f'Appended to the queue: **{song["title"]}**')
 
     @bridge.bridge_command(name='skip', help='Skips the current song being played')
     @commands.guild_only()
     async def skip(self, ctx: bridge.BridgeContext):
-        if self.voice_client:
-            self.voice_client.stop()
-            # try to play next in the queue if it exists
-            await self.play_music(ctx)
+        player = self.players.get(ctx.guild.id)
+
+        # the player continues with the next song in the queue if it exists
+        player.skip()
 
     @bridge.bridge_command(name='clear_queue', aliases=['clearqueue'], help='clears the queue')
     @commands.guild_only()
     async def clear_queue(self, ctx: bridge.BridgeContext):
-        self.music_queue = []
+        player = self.players.get(ctx.guild.id)
+
+        player.queue.clear()
+        player.cancel_imports()
 
         await ctx.respond('The queue has been cleared.')
 
     @bridge.bridge_command(name='display_queue', aliases=['displayqueue'],
-                           help='displays up to 10 songs that will be played next')
+                           help='displays a page of the songs that will be played next')
     @commands.guild_only()
-    async def display_queue(self, ctx: bridge.BridgeContext):
+    async def display_queue(self, ctx: bridge.BridgeContext, page: int = 1):
         global embedColor
         time = datetime.now()
         formatted_time = time.strftime('%H:%M')
 
-        queued_songs = []
+        player = self.players.get(ctx.guild.id)
 
-        for i in range(len(self.music_queue)):
-            # display a max of 5 songs in the current queue
-            if i >= 9:
-                if len(self.music_queue) > 10:
-                    queued_songs.append('...')
-                break
+        if player.queue:
+            page_count = player.queue.page_count(self.queue_page_size)
+            page = min(max(page, 1), page_count)
 
-            queued_songs.append(self.music_queue[i][0]['title'])
+            queue_string = '\n'.join(f'`{position}.` {track.title} `[{format_duration(track.duration)}]`'
+                                      for position, track in player.queue.page(page, self.queue_page_size))
 
-        if queued_songs:
-            queue_string = ", \n".join(queued_songs)
             embed = discord.Embed(title='Queue',
-                                  description=f'The `{len(queued_songs)}` '
-                                              f'{"song" if len(queued_songs) == 1 else "songs"} that will be '
-                                              'played next.',
+                                  description=f'The `{len(player.queue)}` '
+                                              f'{"song" if len(player.queue) == 1 else "songs"} that will be '
+                                              'played next.\n'
+                                              f'Total Duration: `{format_duration(player.queue.total_duration)}`',
                                   color=embedColor)
-            embed.add_field(name='About to be played: ', value=queue_string, inline=False)
+            embed.add_field(name=f'About to be played (Page {page}/{page_count}): ', value=queue_string, inline=False)
 
         else:
             embed = discord.Embed(title='Queue',
@@ -299,6 +276,44 @@ class Music(commands.Cog, name='Music', description='contains commands for playi
 
         await ctx.respond(embed=embed)
 
+    @bridge.bridge_command(name='remove_track', aliases=['removetrack'],
+                           help='removes the song at the given position from the queue')
+    @commands.guild_only()
+    async def remove_track(self, ctx: bridge.BridgeContext, position: int):
+        player = self.players.get(ctx.guild.id)
+
+        try:
+            track = player.queue.remove(position)
+            player.schedule_prefetch()
+            await ctx.respond(f'Removed from the queue: **{track.title}**')
+
+        except IndexError:
+            await ctx.respond(f'{ctx.author.mention}, there is no song at position `{position}` in the queue.')
+
+    @bridge.bridge_command(name='move_track', aliases=['movetrack'],
+                           help='moves the song at the given position to a new position in the queue')
+    @commands.guild_only()
+    async def move_track(self, ctx: bridge.BridgeContext, position: int, new_position: int):
+        player = self.players.get(ctx.guild.id)
+
+        try:
+            track = player.queue.move(position, new_position)
+            player.schedule_prefetch()
+            await ctx.respond(f'Moved **{track.title}** to position `{new_position}`.')
+
+        except IndexError:
+            await ctx.respond(f'{ctx.author.mention}, the queue only contains `{len(player.queue)}` songs.')
+
+    @bridge.bridge_command(name='shuffle_queue', aliases=['shufflequeue', 'shuffle'], help='shuffles the queue')
+    @commands.guild_only()
+    async def shuffle_queue(self, ctx: bridge.BridgeContext):
+        player = self.players.get(ctx.guild.id)
+
+        player.queue.shuffle()
+        player.schedule_prefetch()
+
+        await ctx.respond('The queue has been shuffled.')
+
     # ------
     # volume
     # ------
@@ -307,19 +322,93 @@ class Music(commands.Cog, name='Music', description='contains commands for playi
     @commands.guild_only()
     async def volume(self, ctx: bridge.BridgeContext, new_volume: int):
         """changes the audio sources volume"""
-        if self.voice_client:
-            if self.voice_client.source:
+        player = self.players.get(ctx.guild.id)
+
+        if player.voice_client:
+            if player.voice_client.source:
                 if 0 <= new_volume <= 100:
                     new_volume_float = new_volume / 100
 
-                    self.volume = new_volume_float
-                    self.voice_client.source.volume = new_volume_float
+                    # the volume is applied by ffmpeg, so the current song is reopened at its current position
+                    await player.set_volume(new_volume_float)
 
                     await ctx.respond(f'Set the volume to **{new_volume}%**.')
 
                 else:
                     await ctx.respond('Please enter a volume between 0 and 100.')
 
+    # ------
+    # music_stats
+    # ------
+
+    @bridge.bridge_command(name='music_stats', aliases=['musicstats'], help='sends metrics of the music player')
+    @commands.is_owner()
+    async def music_stats(self, ctx: bridge.BridgeContext):
+        """sends metrics of the music player"""
+        global embedColor
+        time = datetime.now()
+        formatted_time = time.strftime('%H:%M')
+
+        embed = discord.Embed(title='Music Statistics',
+                              description='metrics of the music player\n',
+                              color=embedColor)
+        embed.set_footer(text=f'BerbBot - {formatted_time}')
+        embed.set_author(name=f'Requested by: {ctx.author}',
+                         icon_url=ctx.author.avatar.url)
+
+        # add content
+        player_stats = self.players.stats()
+        embed.add_field(name='Players',
+                        value=f'Players: `{player_stats["players"]}`\n'
+                              f'Playing: `{player_stats["playing"]}`\n'
+                              f'Created: `{player_stats["created"]}`\n'
+                              f'Reclaimed: `{player_stats["reclaimed"]}`\n'
+                              f'Prefetched Transitions: `{player_stats["prefetched"]}`\n'
+                              f'Cold Starts: `{player_stats["cold_starts"]}`',
+                        inline=False)
+
+        cpu_usages = player_stats['cpu_usages']
+        embed.add_field(name='Audio Pipeline',
+                        value=f'Opus Passthrough: `{player_stats["passthrough"]}`\n'
+                              f'Transcoded: `{player_stats["transcoded"]}`\n'
+                              f'Active Streams: `{len(cpu_usages)}`\n'
+                              f'Average CPU per Stream: '
+                              f'`{sum(cpu_usages) / len(cpu_usages) if cpu_usages else 0.0:.1%}`\n'
+                              f'Max CPU per Stream: `{max(cpu_usages, default=0.0):.1%}`',
+                        inline=False)
+
+        resolver_stats = self.resolver.stats()
+        embed.add_field(name='YouTube Resolver',
+                        value=f'Waiting: `{resolver_stats["waiting"]}`\n'
+                              f'Running: `{resolver_stats["running"]}`\n'
+                              f'Resolved: `{resolver_stats["resolved"]}`\n'
+                              f'Failed: `{resolver_stats["failed"]}`\n'
+                              f'Timeouts: `{resolver_stats["timeouts"]}`\n'
+                              f'Average Latency: `{resolver_stats["average_latency"]:.2f}s`\n'
+                              f'Max Latency: `{resolver_stats["max_latency"]:.2f}s`',
+                        inline=False)
+
+        disk_cache_stats = self.disk_cache.stats()
+        embed.add_field(name='Audio Disk Cache',
+                        value=f'Files: `{disk_cache_stats["files"]}`\n'
+                              f'Size: `{disk_cache_stats["size"] / 1024 ** 2:.1f}/'
+                              f'{disk_cache_stats["max_size"] / 1024 ** 2:.0f} MiB`\n'
+                              f'Hit Rate: `{disk_cache_stats["hit_rate"]:.1%}`\n'
+                              f'Stored: `{disk_cache_stats["stored"]}`\n'
+                              f'Evicted: `{disk_cache_stats["evicted"]}`',
+                        inline=False)
+
+        for name, cache_stats in (('Search Cache', resolver_stats['search_cache']),
+                                  ('Stream URL Cache', resolver_stats['stream_url_cache'])):
+            embed.add_field(name=name,
+                            value=f'Size: `{cache_stats["size"]}/{cache_stats["max_size"]}`\n'
+                                  f'Hits: `{cache_stats["hits"]}`\n'
+                                  f'Misses: `{cache_stats["misses"]}`\n'
+                                  f'Hit Rate: `{cache_stats["hit_rate"]:.1%}`',
+                            inline=True)
+
+        await ctx.respond(embed=embed)
+
 
 # cog related functions
 def setup(client):
@@ -4,6 +4,8 @@ import sys
 import dotenv
 import traceback
 import logging
+import asyncio
+from time import monotonic
 import discord
 from discord.ext import commands
 from datetime import datetime
@@ -28,6 +30,37 @@ class CommandErrorHandler(commands.Cog, name='On Command Error Listener',
     def __init__(self, client):
         self.client = client
 
+        # identical errors of the same user in the same channel are collapsed into one reply within this window
+        self.dedupe_window = 30    # seconds
+        self.edit_interval = 3    # seconds, the collapsed reply is edited at most once per interval
+
+        self.recent_errors = {}    # {(user_id, channel_id, error_type, invoked_with): {...}, ...}
+
+    def prune_recent_errors(self, now):
+        """forgets errors whose window has passed"""
+        for key in [key for key, entry in self.recent_errors.items() if now - entry['time'] >= self.dedupe_window]:
+            del self.recent_errors[key]
+
+    async def update_occurrences(self, key):
+        """edits the collapsed reply once the edit interval has passed, so it shows the latest occurrence count"""
+        await asyncio.sleep(self.edit_interval)
+
+        entry = self.recent_errors.get(key)
+        if entry is None:
+            return
+
+        entry['edit_task'] = None
+        if entry['message'] is None:
+            # the reply is still being sent, it schedules the edit itself once it has been sent
+            return
+
+        entry['embed'].set_footer(text=f'{entry["footer"]} - occurred {entry["count"]} times')
+
+        try:
+            await entry['message'].edit(embed=entry['embed'])
+        except discord.HTTPException as e:
+            logger.exception(e)
+
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
         """"handle occurring command errors"""
@@ -50,6 +83,28 @@ class CommandErrorHandler(commands.Cog, name='On Command Error Listener',
         if isinstance(error, ignored):
             return
 
+        # collapse identical errors of the same user in the same channel into the reply that was already sent
+        now = monotonic()
+        self.prune_recent_errors(now)
+
+        key = (ctx.author.id, ctx.channel.id, type(error), ctx.invoked_with)
+        entry = self.recent_errors.get(key)
+
+        if entry is not None:
+            entry['count'] += 1
+            entry['time'] = now
+
+            if entry['edit_task'] is None:
+                entry['edit_task'] = asyncio.create_task(self.update_occurrences(key))
+            return
+
+        # remember the error before the first await, so errors arriving while the reply is sent are collapsed as well
+        entry = self.recent_errors[key] = {'message': None, 'embed': None, 'footer': f'BerbBot - {formatted_time}',
+                                           'count': 1, 'time': now, 'edit_task': None}
+
+        # resolve the prefix that is displayed in the error messages once
+        prefix = self.client.command_prefix(self.client, ctx.message)[2]
+
         async with ctx.typing():
             # initialize error embed
             embed = discord.Embed()
@@ -64,26 +119,26 @@ class CommandErrorHandler(commands.Cog, name='On Command Error Listener',
                                       color=errorEmbedColor)
                 embed.add_field(name='Help',
                                 value='For a list of valid commands use: \n'
-                                      f'`{self.client.command_prefix(self.client, ctx.message)[2]}help`',
+                                      f'`{prefix}help`',
                                 inline=False)
 
             elif isinstance(error, commands.DisabledCommand):
                 embed = discord.Embed(title='Error',
-                                      description=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                      description=f'`{prefix}'
                                                   f'{ctx.command}` has been disabled.',
                                       color=errorEmbedColor)
 
             elif isinstance(error, commands.BotMissingPermissions):
                 embed = discord.Embed(title='Error',
                                       description='I am missing permission to execute '
-                                                  f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                                  f'`{prefix}'
                                                   f'{ctx.command}`.',
                                       color=errorEmbedColor)
 
             elif isinstance(error, commands.BotMissingRole):
                 embed = discord.Embed(title='Error',
                                       description='I do not have the required role to execute '
-                                                  f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                                  f'`{prefix}'
                                                   f'{ctx.command}`.',
                                       color=errorEmbedColor)
 
@@ -91,31 +146,31 @@ class CommandErrorHandler(commands.Cog, name='On Command Error Listener',
             elif isinstance(error, commands.MissingPermissions):
                 embed = discord.Embed(title='Error',
                                       description='You do not have the required permission to execute '
-                                                  f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                                  f'`{prefix}'
                                                   f'{ctx.command}`.',
                                       color=errorEmbedColor)
 
             elif isinstance(error, commands.NotOwner):
                 embed = discord.Embed(title='Error',
                                       description='You need to be my owner to execute '
-                                                  f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                                  f'`{prefix}'
                                                   f'{ctx.command}`.',
                                       color=errorEmbedColor)
 
             elif isinstance(error, commands.NoPrivateMessage):
                 try:
                     embed = discord.Embed(title='Error',
-                                          description=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                          description=f'`{prefix}'
                                                       f'{ctx.command}` can **NOT** be used in Direct Messages.',
                                           color=errorEmbedColor)
                 except discord.HTTPException:
                     pass
 
             elif isinstance(error, commands.PrivateMessageOnly):
-                await ctx.send(f'`{self.client.command_prefix(self.client, ctx.message)[2]}{ctx.command}`')
+                await ctx.send(f'`{prefix}{ctx.command}`')
                 try:
                     embed = discord.Embed(title='Error',
-                                          description=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                          description=f'`{prefix}'
                                                       f'{ctx.command}` can **EXCLUSIVELY** be used in Direct Messages.',
                                           color=errorEmbedColor)
                 except discord.HTTPException:
@@ -123,39 +178,39 @@ class CommandErrorHandler(commands.Cog, name='On Command Error Listener',
 
             elif isinstance(error, commands.CommandOnCooldown):
                 embed = discord.Embed(title='Error',
-                                      description=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                      description=f'`{prefix}'
                                                   f'{ctx.command}` is currently on cooldown. Try again later.',
                                       color=errorEmbedColor)
 
             elif isinstance(error, commands.MissingRequiredArgument):
                 embed = discord.Embed(title='Error',
                                       description='I am missing required arguments to execute '
-                                                  f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                                  f'`{prefix}'
                                                   f'{ctx.command}`. \n',
                                       color=errorEmbedColor)
                 embed.add_field(name='Usage',
-                                value=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                value=f'`{prefix}'
                                       f'{ctx.command.qualified_name} {ctx.command.signature}`',
                                 inline=False)
 
             elif isinstance(error, commands.TooManyArguments):
                 embed = discord.Embed(title='Error',
-                                      description=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                      description=f'`{prefix}'
                                                   f'{ctx.command}` uses less arguments. \n',
                                       color=errorEmbedColor)
                 embed.add_field(name='Usage',
-                                value=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                value=f'`{prefix}'
                                       f'{ctx.command.qualified_name} {ctx.command.signature}`',
                                 inline=False)
 
             elif isinstance(error, commands.BadArgument):
                 embed = discord.Embed(title='Error',
-                                      description=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                      description=f'`{prefix}'
                                                   f'{ctx.command}` uses a different kind of arguments. '
                                                   f'You passed an invalid argument\n',
                                       color=errorEmbedColor)
                 embed.add_field(name='Usage',
-                                value=f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                value=f'`{prefix}'
                                       f'{ctx.command.qualified_name} {ctx.command.signature}`',
                                 inline=False)
 
@@ -171,7 +226,7 @@ class CommandErrorHandler(commands.Cog, name='On Command Error Listener',
                 # configure embed
                 embed = discord.Embed(title='Error',
                                       description=f'Ignoring exception in command '
-                                                  f'`{self.client.command_prefix(self.client, ctx.message)[2]}'
+                                                  f'`{prefix}'
                                                   f'{ctx.command}`: `{sys.stderr}`',
                                       color=errorEmbedColor)
 
@@ -182,24 +237,39 @@ class CommandErrorHandler(commands.Cog, name='On Command Error Listener',
             embed.set_footer(text=f'BerbBot - {formatted_time}')
 
         # finally, send error embed
-        # if the traceback is too long for one, send multiple embeds
-        if len(formatted_traceback) > 1024:
-            split_traceback = []
-
-            n = 1024
-            for index in range(0, len(formatted_traceback), n):
-                split_traceback.append(formatted_traceback[index: index + n])
-
-            for part in split_traceback:
-                embed.remove_field(0)
-                embed.add_field(name='Traceback',
-                                value=part,
-                                inline=False)
+        try:
+            # if the traceback is too long for one, send multiple embeds
+            if len(formatted_traceback) > 1024:
+                split_traceback = []
+
+                n = 1024
+                for index in range(0, len(formatted_traceback), n):
+                    split_traceback.append(formatted_traceback[index: index + n])
+
+                for part in split_traceback:
+                    embed.remove_field(0)
+                    embed.add_field(name='Traceback',
+                                    value=part,
+                                    inline=False)
+
+                    message = await ctx.send(embed=embed)
+
+            else:
+                message = await ctx.send(embed=embed)
+
+        except Exception:
+            # without a reply there is nothing to collapse the next errors into
+            if self.recent_errors.get(key) is entry:
+                del self.recent_errors[key]
+            raise
 
-                await ctx.send(embed=embed)
+        # remember the reply, so repeated errors only update its occurrence count
+        entry['message'] = message
+        entry['embed'] = embed
 
-        else:
-            await ctx.send(embed=embed)
+        if entry['count'] > 1 and entry['edit_task'] is None:
+            # errors arrived while the reply was sent
+            entry['edit_task'] = asyncio.create_task(self.update_occurrences(key))
 
 
 # cog related functions
@@ -1,8 +1,7 @@
 # imports
 import os
 import logging
-from discord.ext import commands
-import sqlite3
+from discord.ext import commands, tasks
 
 
 # logging
@@ -16,6 +15,18 @@ class OnMessageListener(commands.Cog, name='On Message Listener', description='c
     def __init__(self, client):
         self.client = client
 
+        self.flush_message_counter.start()
+
+    def cog_unload(self):
+        """stop the flush loop and write the remaining message counts"""
+        self.flush_message_counter.cancel()
+        self.client.loop.create_task(self.client.message_counter.flush())
+
+    @tasks.loop(seconds=30)
+    async def flush_message_counter(self):
+        """writes the buffered message counts to "databank.db" periodically"""
+        await self.client.message_counter.flush()
+
     @commands.Cog.listener()
     async def on_message(self, message):
         """"custom on_ready event"""
@@ -28,27 +39,13 @@ class OnMessageListener(commands.Cog, name='On Message Listener', description='c
             guild_id = message.guild.id
             user_id = message.author.id
 
-            # connect to "databank.db" and create cursor
-            connection = sqlite3.connect('../../data/databank.db')
-            cursor = connection.cursor()
-
-            # create table if it does not exist
-            sql_command_query = """CREATE TABLE IF NOT EXISTS 
-                                            message_counter(guild_id INTEGER, user_id INTEGER, message_count INTEGER DEFAULT 1, 
-                                            UNIQUE(guild_id, user_id))"""
-            cursor.execute(sql_command_query)
-
-            # insert new count for user into table or update it if it already exists (add 1)
-            sql_command_query = f"""INSERT INTO message_counter(guild_id, user_id) 
-                                        VALUES({guild_id}, {user_id}) 
-                                        ON CONFLICT(guild_id, user_id) DO UPDATE SET message_count = message_count + 1"""
-            cursor.execute(sql_command_query)
-
-            # commit changes and close connection
-            cursor.close()
+            # update the in-memory leaderboard of the guild
+            self.client.leaderboard.add(guild_id, user_id)
 
-            connection.commit()
-            connection.close()
+            # count the message in memory, the counts are written to "databank.db" in batches
+            if self.client.message_counter.increment(guild_id, user_id, message.created_at.timestamp()):
+                # the buffer is full, do not wait for the next periodic flush
+                await self.client.message_counter.flush()
 
         # do not process the following for messages sent by the bot itself
         if message.author == self.client.user:
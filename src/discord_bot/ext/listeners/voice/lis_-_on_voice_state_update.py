@@ -2,7 +2,7 @@
 import os
 import logging
 from discord.ext import commands
-import asyncio
+from voice_idle import HumanMemberCounts, IdleScheduler
 
 # logging
 """create logger by inheriting configuration from root logger"""
@@ -16,28 +16,66 @@ class OnVoiceStateUpdateListener(commands.Cog, name='OnVoiceStateUpdateListener'
     def __init__(self, client):
         self.client = client
 
+        # the listener never sleeps: one scheduler serves the leave timers of all guilds
+        self.human_member_counts = HumanMemberCounts()
+        self.idle_scheduler = IdleScheduler(self.leave_idle_channel, timeout=30)
+
+    def cog_unload(self):
+        """stop the leave timers"""
+        self.idle_scheduler.close()
+
+    async def leave_idle_channel(self, guild_id, member):
+        """makes the bot leave the voice channel of a guild if it is still alone in there"""
+        guild = self.client.get_guild(guild_id)
+
+        if not guild or not guild.voice_client or not guild.voice_client.is_connected():
+            return
+
+        # count again instead of trusting the cached count, it runs at most once per timeout
+        if self.human_member_counts.recount(guild.voice_client.channel) > 0:
+            return
+
+        # let the music player clean up its queue and state, if it has one
+        music = self.client.get_cog('Music')
+        player = music.players.peek(guild_id) if music else None
+
+        if player:
+            await player.disconnect()
+
+        else:
+            guild.voice_client.stop()
+            await guild.voice_client.disconnect()
+
+        if not member.bot:
+            await member.send('I left the voice channel as you were the last person in it and left.')
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """forgets the member counts, voice events may have been missed while the bot was disconnected"""
+        self.human_member_counts.clear()
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        """forgets the member counts, voice events may have been missed while the session was interrupted"""
+        self.human_member_counts.clear()
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """makes the bot leave any voice channel if it is alone in there for over 30 seconds"""
-        if not member.guild.voice_client:
-            # Exit if the bot is not connected to a voice channel
+        self.human_member_counts.update(member, before, after)
+
+        voice_client = member.guild.voice_client
+        if not voice_client or not voice_client.channel:
+            # the bot is not connected to a voice channel in this guild
+            self.idle_scheduler.cancel(member.guild.id)
             return
 
-        on_leave_cooldown = False
-        if len(member.guild.voice_client.channel.members) == 1:
-            # The bot is the only one in the voice channel
-            # Wait 30 seconds before checking again, then leave the voice channel
-            if not on_leave_cooldown:    # do not try leaving multiple times, it could cause errors
-                on_leave_cooldown = True
-                await asyncio.sleep(30)
-
-                if len(member.guild.voice_client.channel.members) == 1:
-                    if member.guild.voice_client:
-                        if member.guild.voice_client.is_connected():
-                            member.guild.voice_client.stop()
-                            await member.guild.voice_client.disconnect()
-                            on_leave_cooldown = False
-                            await member.send('I left the voice channel as you were the last person in it and left.')
+        if self.human_member_counts.get(voice_client.channel) == 0:
+            # the bot is alone in the voice channel, leave in 30 seconds unless someone joins
+            self.idle_scheduler.arm(member.guild.id, member)
+
+        else:
+            self.idle_scheduler.cancel(member.guild.id)
 
 
 # cog related functions
@@ -0,0 +1,162 @@
+# imports
+import logging
+import asyncio
+import aiohttp
+from time import monotonic
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+class HttpError(Exception):
+    """raised for responses with an error status"""
+    def __init__(self, status, url, headers=None):
+        self.status = status
+        self.url = url
+        self.headers = headers if headers is not None else {}
+
+        # the query is left out, it may contain api keys
+        super().__init__(f'{status} for {url.split("?")[0]}')
+
+
+class HttpResponse:
+    """status, headers and decoded json body of a response"""
+    __slots__ = ('status', 'headers', 'data')
+
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+
+# http client
+class HttpClient:
+    """one pooled aiohttp session for all outbound api calls, with timeouts, retries and an optional response cache
+
+    connections are kept alive and limited per host, so a slow api can not use up the connections of all the others
+    """
+    def __init__(self, limit=100, limit_per_host=10, timeout=10, retries=2, backoff=0.5, max_cache_size=1024):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout    # seconds per attempt
+        self.retries = retries    # additional attempts after connection errors, timeouts, 429 and 5xx responses
+        self.backoff = backoff    # seconds, doubled for every retry
+        self.max_cache_size = max_cache_size
+
+        self.session = None    # created on first use, as it has to be created inside the running event loop
+        self.cache = OrderedDict()    # {(method, url, params, json): (expires at, HttpResponse), ...}
+
+        # metrics
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self.cache_hits = 0
+        self.hosts = {}    # {host: requests, ...}
+
+    def get_session(self):
+        """returns the shared session, creating it if necessary"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=300, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+        return self.session
+
+    @staticmethod
+    def get_retry_after(headers, default):
+        """returns the seconds to wait given by a "Retry-After" header, or the default"""
+        try:
+            return float(headers['Retry-After'])
+
+        except (KeyError, ValueError):
+            return default
+
+    async def request(self, method, url, *, params=None, json=None, headers=None, cache_ttl=None, retries=None):
+        """sends a request and returns a HttpResponse; responses are cached for "cache_ttl" seconds if given
+
+        "retries" overrides the default number of retries, e.g. for callers that handle rate limits themselves;
+        raises HttpError for error responses and aiohttp.ClientError or asyncio.TimeoutError if all attempts failed
+        """
+        key = (method, url, tuple(sorted(params.items())) if params else None, repr(json) if json else None)
+
+        if cache_ttl:
+            cached = self.cache.get(key)
+
+            if cached is not None and cached[0] > monotonic():
+                self.cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached[1]
+
+        host = urlparse(url).netloc
+        delay = self.backoff
+        retries = self.retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            self.requests += 1
+            self.hosts[host] = self.hosts.get(host, 0) + 1
+
+            try:
+                async with self.get_session().request(method, url, params=params, json=json,
+                                                      headers=headers) as response:
+                    if (response.status == 429 or response.status >= 500) and attempt < retries:
+                        # the api is overloaded, try again later
+                        self.retried += 1
+                        await asyncio.sleep(self.get_retry_after(response.headers, delay))
+                        delay *= 2
+                        continue
+
+                    if response.status >= 400:
+                        self.failed += 1
+                        raise HttpError(response.status, url, response.headers)
+
+                    data = await response.json(content_type=None) if response.status != 204 else None
+                    result = HttpResponse(response.status, response.headers, data)
+                    break
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == retries:
+                    self.failed += 1
+                    raise
+
+                logger.warning(f'{method} {host} failed, retrying in {delay}s: "{e!r}"')
+                self.retried += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        if cache_ttl:
+            self.cache[key] = (monotonic() + cache_ttl, result)
+            self.cache.move_to_end(key)
+
+            while len(self.cache) > self.max_cache_size:
+                self.cache.popitem(last=False)
+
+        return result
+
+    async def get_json(self, url, **kwargs):
+        """sends a GET request and returns the decoded json body"""
+        return (await self.request('GET', url, **kwargs)).data
+
+    async def post_json(self, url, json, **kwargs):
+        """sends a POST request with a json body and returns the decoded json body"""
+        return (await self.request('POST', url, json=json, **kwargs)).data
+
+    def stats(self):
+        """returns request, retry and cache metrics"""
+        return {
+            'requests': self.requests,
+            'retried': self.retried,
+            'failed': self.failed,
+            'cache_hits': self.cache_hits,
+            'cache_size': len(self.cache),
+            'hosts': dict(sorted(self.hosts.items(), key=lambda item: item[1], reverse=True))
+        }
+
+    async def close(self):
+        """closes the session and all of its connections"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,185 @@
+# imports
+import logging
+import heapq
+from time import time, localtime
+from collections import deque
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# player activity
+class PlayerActivity:
+    """login history of a player and the state of their entry in the schedule"""
+    __slots__ = ('online', 'last_login', 'last_logout', 'logins', 'interval', 'next_check', 'sequence')
+
+    def __init__(self, interval):
+        self.online = False
+        self.last_login = None    # seconds since the epoch
+        self.last_logout = None    # seconds since the epoch
+        self.logins = deque(maxlen=20)    # recent logins, seconds since the epoch
+
+        self.interval = interval    # seconds, before it is stretched to fit the budget
+        self.next_check = None
+        self.sequence = None    # of the current heap entry, None while the player is being checked
+
+
+# poll schedule
+class PollSchedule:
+    """priority queue of the next check per player, the intervals adapt to the login history of each player
+
+    players that are online are checked every "min_interval" seconds, players that are offline every
+    "base_interval" seconds, stretched by one "base_interval" per day since their last logout up to "max_interval";
+    the interval is halved at times of day the player logged in recently;
+    all intervals are stretched evenly whenever the players together would need more than "budget" requests per minute;
+    the first checks of new players are spread at the pace of the budget, so restoring or adding many players at once
+    does not check all of them in the same cycle
+    """
+    def __init__(self, budget, base_interval=300, min_interval=60, max_interval=21600, active_window=3600):
+        self.budget = budget    # requests per minute
+        self.base_interval = base_interval    # seconds
+        self.min_interval = min_interval    # seconds
+        self.max_interval = max_interval    # seconds
+        self.active_window = active_window    # seconds around the time of day of a recent login
+
+        self.heap = []    # [(next check, sequence number, player_uuid), ...]
+        self.players = {}    # {player_uuid: PlayerActivity, ...}
+        self.sequence = 0
+        self.demand = 0.0    # requests per second if every player was checked at their own interval
+        self.next_start = 0.0    # seconds since the epoch, the earliest first check of the next new player
+
+    def get_start_delay(self):
+        """returns the delay of the first check of a new player, one check per budget interval after the last one"""
+        now = time()
+        start = max(now, self.next_start)
+        self.next_start = start + 60 / self.budget
+
+        return start - now
+
+    def add(self, player_uuid, delay=None, player=None):
+        """adds a player, the first check is due after "delay" seconds (spread at the pace of the budget if None);
+        "player" is their last known hypixel data"""
+        if player_uuid in self.players:
+            return
+
+        if delay is None:
+            delay = self.get_start_delay()
+
+        activity = self.players[player_uuid] = PlayerActivity(self.base_interval)
+
+        if player is not None:
+            self.record(activity, player, time())
+
+        self.demand += 1 / activity.interval
+        self.push(player_uuid, delay)
+
+    def remove(self, player_uuid):
+        """removes a player, their heap entry is skipped when it is due"""
+        activity = self.players.pop(player_uuid, None)
+
+        if activity is not None:
+            self.demand = max(0.0, self.demand - 1 / activity.interval)
+
+    def push(self, player_uuid, delay):
+        """schedules the next check of a player"""
+        activity = self.players[player_uuid]
+
+        self.sequence += 1
+        activity.sequence = self.sequence
+        activity.next_check = time() + delay
+        heapq.heappush(self.heap, (activity.next_check, self.sequence, player_uuid))
+
+    def pop_due(self):
+        """removes and returns the players whose check is due, earliest first"""
+        now = time()
+        due = []
+
+        while self.heap and self.heap[0][0] <= now:
+            next_check, sequence, player_uuid = heapq.heappop(self.heap)
+            activity = self.players.get(player_uuid)
+
+            # skip removed players and replaced entries
+            if activity is None or activity.sequence != sequence:
+                continue
+
+            activity.sequence = None
+            due.append(player_uuid)
+
+        return due
+
+    def is_active_hour(self, activity, now):
+        """checks whether the player logged in recently at about the same time of day"""
+        current = localtime(now)
+        current_seconds = current.tm_hour * 3600 + current.tm_min * 60
+
+        for login in activity.logins:
+            login_time = localtime(login)
+            distance = abs(login_time.tm_hour * 3600 + login_time.tm_min * 60 - current_seconds)
+
+            if min(distance, 86400 - distance) <= self.active_window:
+                return True
+
+        return False
+
+    def get_interval(self, activity, now):
+        """returns the interval of a player based on their status and login history"""
+        if activity.online:
+            return self.min_interval
+
+        idle_days = max(0.0, now - activity.last_logout) / 86400 if activity.last_logout is not None else 0.0
+        interval = self.base_interval * (1 + idle_days)
+
+        if self.is_active_hour(activity, now):
+            interval /= 2
+
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def get_scale(self):
+        """returns the factor all intervals are stretched by to stay within the budget"""
+        return max(1.0, self.demand * 60 / self.budget)
+
+    def record(self, activity, player, now):
+        """applies the login and logout times of the hypixel data of a player and returns their new interval"""
+        # hypixel reports the times in milliseconds
+        last_login = player['lastLogin'] / 1000 if player.get('lastLogin') else None
+        last_logout = player['lastLogout'] / 1000 if player.get('lastLogout') else None
+
+        if last_login is not None and last_login != activity.last_login:
+            activity.logins.append(last_login)
+
+        activity.last_login = last_login
+        activity.last_logout = last_logout
+        activity.online = last_login is not None and (last_logout is None or last_login > last_logout)
+
+        activity.interval = self.get_interval(activity, now)
+        return activity.interval
+
+    def update(self, player_uuid, player=None):
+        """schedules the next check of a player; "player" is their hypixel data, None if the check failed"""
+        activity = self.players.get(player_uuid)
+        if activity is None:
+            # the player was removed while being checked
+            return
+
+        now = time()
+
+        if player is not None:
+            previous_interval = activity.interval
+            self.demand += 1 / self.record(activity, player, now) - 1 / previous_interval
+
+        self.push(player_uuid, activity.interval * self.get_scale())
+
+    def stats(self):
+        """returns the number of players, the requests per minute and the time until the next check"""
+        next_checks = [activity.next_check for activity in self.players.values() if activity.sequence is not None]
+
+        return {
+            'players': len(self.players),
+            'online': sum(1 for activity in self.players.values() if activity.online),
+            'demand': self.demand * 60,
+            'budget': self.budget,
+            'scale': self.get_scale(),
+            'next_check': max(0.0, min(next_checks) - time()) if next_checks else None
+        }
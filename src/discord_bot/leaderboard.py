@@ -0,0 +1,92 @@
+# imports
+import logging
+import heapq
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# guild leaderboard
+class GuildLeaderboard:
+    """message counts of one guild with an incrementally maintained top-k
+
+    scores only ever increase, so a member can only enter the top-k by passing its lowest entry;
+    that keeps the top-k exact while every update costs at most O(k)
+    """
+    def __init__(self, size, scores=None):
+        self.size = size
+
+        self.scores = scores if scores is not None else {}    # {user_id: message_count, ...}
+        self.top = heapq.nlargest(size, self.scores, key=self.scores.get)    # [user_id, ...], highest score first
+        self.top_members = set(self.top)
+
+    def add(self, user_id, amount=1):
+        """adds to the score of a member and moves it up in the top-k if necessary"""
+        score = self.scores.get(user_id, 0) + amount
+        self.scores[user_id] = score
+
+        if user_id in self.top_members:
+            index = self.top.index(user_id)
+
+        elif len(self.top) < self.size:
+            self.top.append(user_id)
+            self.top_members.add(user_id)
+            index = len(self.top) - 1
+
+        elif score > self.scores[self.top[-1]]:
+            # replace the lowest entry
+            self.top_members.discard(self.top[-1])
+            self.top[-1] = user_id
+            self.top_members.add(user_id)
+            index = len(self.top) - 1
+
+        else:
+            return
+
+        # bubble the member up to its new position
+        while index > 0 and self.scores[self.top[index - 1]] < score:
+            self.top[index - 1], self.top[index] = self.top[index], self.top[index - 1]
+            index -= 1
+
+    def get_top(self, amount):
+        """returns [(user_id, message_count), ...] of the members with the most messages"""
+        return [(user_id, self.scores[user_id]) for user_id in self.top[:amount]]
+
+
+# leaderboard
+class Leaderboard:
+    """per-guild message leaderboards, warmed from "databank.db" once and updated by the on_message listener"""
+    def __init__(self, database, size=25):
+        self.database = database
+        self.size = size    # the maximum number of members that can be shown
+
+        self.guilds = {}    # {guild_id: GuildLeaderboard, ...}
+
+    def warm(self):
+        """reads all message counts from "databank.db" once; call this before the client is started"""
+        rows = self.database.fetchall_blocking("""SELECT guild_id, user_id, message_count FROM message_counter""")
+
+        scores = {}
+        for guild_id, user_id, message_count in rows:
+            scores.setdefault(guild_id, {})[user_id] = message_count
+
+        self.guilds = {guild_id: GuildLeaderboard(self.size, guild_scores) for guild_id, guild_scores in scores.items()}
+
+        logger.info(f'warmed the message leaderboards of {len(self.guilds)} guilds')
+
+    def add(self, guild_id, user_id, amount=1):
+        """counts messages of a member"""
+        guild_leaderboard = self.guilds.get(guild_id)
+
+        if guild_leaderboard is None:
+            guild_leaderboard = self.guilds[guild_id] = GuildLeaderboard(self.size)
+
+        guild_leaderboard.add(user_id, amount)
+
+    def get_top(self, guild_id, amount):
+        """returns [(user_id, message_count), ...] of the members of a guild with the most messages"""
+        guild_leaderboard = self.guilds.get(guild_id)
+
+        return guild_leaderboard.get_top(min(amount, self.size)) if guild_leaderboard else []
@@ -0,0 +1,209 @@
+# imports
+import logging
+import asyncio
+import time
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# message counter
+class MessageCounter:
+    """write-behind buffer for the "message_counter" table and the activity rollup tables
+
+    increments are accumulated in memory per (guild_id, user_id) and per time bucket and written to "databank.db"
+    as executemany upserts inside one transaction
+
+    rollups (all times are UTC):
+        message_activity_hourly: messages per hour (unix time // 3600), kept for "hourly_retention" hours,
+                                 used for the messages of the last hours
+        message_activity_daily: messages per day (unix time // 86400)
+        message_activity_hour_of_day: messages per hour of the day (0-23), used for the most active hour
+    """
+    def __init__(self, database, flush_threshold=500, hourly_retention=24 * 7):
+        self.database = database
+        self.flush_threshold = flush_threshold    # number of buffered users that triggers a flush
+        self.hourly_retention = hourly_retention    # hours
+
+        self.pending = {}    # {(guild_id, user_id): count, ...}
+        self.pending_hourly = {}    # {(guild_id, user_id, hour): count, ...}
+        self.pending_daily = {}    # {(guild_id, user_id, day): count, ...}
+        self.pending_hour_of_day = {}    # {(guild_id, user_id, hour_of_day): count, ...}
+
+        # held while flushing and while reading through the buffer, so counts are never missing or doubled
+        self.lock = asyncio.Lock()
+
+        self.last_prune_hour = None
+
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    # ------
+    # writing
+    # ------
+
+    @staticmethod
+    def _write(batch, prune_before_hour):
+        """returns a function that upserts a batch of increments, to be run by the database"""
+        totals, hourly, daily, hours_of_day = batch
+
+        def upsert_message_counts(connection):
+            # insert new counts into the tables or add them to the existing counts
+            connection.executemany("""INSERT INTO message_counter(guild_id, user_id, message_count)
+            VALUES(?, ?, ?)
+            ON CONFLICT(guild_id, user_id) DO UPDATE SET message_count = message_count + excluded.message_count""",
+                                   [(*key, count) for key, count in totals.items()])
+
+            connection.executemany("""INSERT INTO message_activity_hourly(guild_id, user_id, hour, message_count)
+            VALUES(?, ?, ?, ?)
+            ON CONFLICT(guild_id, user_id, hour) DO UPDATE SET message_count = message_count + excluded.message_count""",
+                                   [(*key, count) for key, count in hourly.items()])
+
+            connection.executemany("""INSERT INTO message_activity_daily(guild_id, user_id, day, message_count)
+            VALUES(?, ?, ?, ?)
+            ON CONFLICT(guild_id, user_id, day) DO UPDATE SET message_count = message_count + excluded.message_count""",
+                                   [(*key, count) for key, count in daily.items()])
+
+            connection.executemany("""INSERT INTO message_activity_hour_of_day(guild_id, user_id, hour_of_day,
+            message_count)
+            VALUES(?, ?, ?, ?)
+            ON CONFLICT(guild_id, user_id, hour_of_day)
+            DO UPDATE SET message_count = message_count + excluded.message_count""",
+                                   [(*key, count) for key, count in hours_of_day.items()])
+
+            # drop hourly buckets that are older than the retention period (at most once per hour)
+            if prune_before_hour is not None:
+                connection.execute("""DELETE FROM message_activity_hourly WHERE hour < ?""", (prune_before_hour,))
+
+        return upsert_message_counts
+
+    def _swap(self):
+        """takes the buffered increments, new messages are counted in fresh buffers while writing"""
+        batch = (self.pending, self.pending_hourly, self.pending_daily, self.pending_hour_of_day)
+
+        self.pending = {}
+        self.pending_hourly = {}
+        self.pending_daily = {}
+        self.pending_hour_of_day = {}
+
+        return batch
+
+    def _prune_before_hour(self):
+        """returns the hour before which hourly buckets are deleted, or None if they were pruned this hour"""
+        current_hour = int(time.time()) // 3600
+
+        if current_hour == self.last_prune_hour:
+            return None
+
+        self.last_prune_hour = current_hour
+        return current_hour - self.hourly_retention
+
+    def increment(self, guild_id, user_id, timestamp=None):
+        """counts one message; returns True if the buffer is full and should be flushed"""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        hour = timestamp // 3600
+
+        key = (guild_id, user_id)
+        self.pending[key] = self.pending.get(key, 0) + 1
+
+        key = (guild_id, user_id, hour)
+        self.pending_hourly[key] = self.pending_hourly.get(key, 0) + 1
+
+        key = (guild_id, user_id, timestamp // 86400)
+        self.pending_daily[key] = self.pending_daily.get(key, 0) + 1
+
+        key = (guild_id, user_id, hour % 24)
+        self.pending_hour_of_day[key] = self.pending_hour_of_day.get(key, 0) + 1
+
+        return len(self.pending) >= self.flush_threshold
+
+    async def flush(self):
+        """writes all buffered increments to "databank.db" in one transaction"""
+        async with self.lock:
+            if not self.pending:
+                return
+
+            batch = self._swap()
+
+            try:
+                await self.database.run(self._write(batch, self._prune_before_hour()))
+
+            except Exception as e:
+                # put the increments back, so they are written with the next flush
+                buffers = (self.pending, self.pending_hourly, self.pending_daily, self.pending_hour_of_day)
+                for buffer, failed_buffer in zip(buffers, batch):
+                    for key, count in failed_buffer.items():
+                        buffer[key] = buffer.get(key, 0) + count
+
+                self.last_prune_hour = None
+
+                logger.exception(e)
+                return
+
+            self.flushes += 1
+            self.flushed_rows += len(batch[0])
+
+            logger.debug(f'flushed {len(batch[0])} message counter rows')
+
+    def flush_blocking(self):
+        """writes all buffered increments to "databank.db"; only use this after the event loop has stopped"""
+        if self.pending:
+            batch = self._swap()
+
+            self.database.run_blocking(self._write(batch, None))
+            logger.info(f'flushed {len(batch[0])} message counter rows on shutdown')
+
+    # ------
+    # reading (all reads include the increments that have not been flushed yet)
+    # ------
+
+    async def get_activity(self, guild_id, user_id, days=7, hours=24):
+        """returns the overall message count, the messages of the last days and hours and the most active hour (UTC)
+        of a user
+
+        only the precomputed rollups are read: one row, at most "days" daily buckets, at most "hours" hourly buckets
+        and 24 hour-of-day buckets; "hours" must not exceed the hourly retention
+        """
+        now = int(time.time())
+        today = now // 86400
+        first_day = today - days + 1
+        current_hour = now // 3600
+        first_hour = current_hour - hours + 1
+
+        def read_activity(connection):
+            total = connection.execute("""SELECT message_count FROM message_counter
+            WHERE guild_id = ? AND user_id = ?""", (guild_id, user_id)).fetchone()
+
+            last_days = connection.execute("""SELECT COALESCE(SUM(message_count), 0) FROM message_activity_daily
+            WHERE guild_id = ? AND user_id = ? AND day >= ?""", (guild_id, user_id, first_day)).fetchone()
+
+            last_hours = connection.execute("""SELECT COALESCE(SUM(message_count), 0) FROM message_activity_hourly
+            WHERE guild_id = ? AND user_id = ? AND hour >= ?""", (guild_id, user_id, first_hour)).fetchone()
+
+            hours_of_day = connection.execute("""SELECT hour_of_day, message_count FROM message_activity_hour_of_day
+            WHERE guild_id = ? AND user_id = ?""", (guild_id, user_id)).fetchall()
+
+            return total[0] if total else 0, last_days[0], last_hours[0], dict(hours_of_day)
+
+        async with self.lock:
+            total, last_days, last_hours, hours_of_day = await self.database.run(read_activity)
+
+            # add the buffered increments
+            total += self.pending.get((guild_id, user_id), 0)
+
+            for day in range(first_day, today + 1):
+                last_days += self.pending_daily.get((guild_id, user_id, day), 0)
+
+            for hour in range(first_hour, current_hour + 1):
+                last_hours += self.pending_hourly.get((guild_id, user_id, hour), 0)
+
+            for hour_of_day in range(24):
+                count = self.pending_hour_of_day.get((guild_id, user_id, hour_of_day), 0)
+                if count:
+                    hours_of_day[hour_of_day] = hours_of_day.get(hour_of_day, 0) + count
+
+        most_active_hour = max(hours_of_day, key=hours_of_day.get) if hours_of_day else None
+
+        return {'total': total, 'last_days': last_days, 'last_hours': last_hours, 'most_active_hour': most_active_hour}
@@ -0,0 +1,95 @@
+# imports
+import logging
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# pragmas
+"""connection settings, applied every time the bot starts"""
+PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',    # safe in WAL mode, only the last transactions can be lost on power failure
+    'PRAGMA mmap_size=268435456'    # 256 MiB
+]
+
+
+# migrations
+"""versioned schema changes: (version, description, [statements])
+
+the version of "databank.db" is stored in "PRAGMA user_version", every migration with a higher version is applied once;
+append new migrations to the end of the list, never change a migration that has already been released
+"""
+MIGRATIONS = [
+    (1, 'create prefix_assignment and message_counter', [
+        """CREATE TABLE IF NOT EXISTS
+        prefix_assignment(guild_id INTEGER, guild_prefix TEXT)""",
+        """CREATE TABLE IF NOT EXISTS
+        message_counter(guild_id INTEGER, user_id INTEGER, message_count INTEGER DEFAULT 1,
+        UNIQUE(guild_id, user_id))"""
+    ]),
+    (2, 'index prefix_assignment by guild_id', [
+        """CREATE INDEX IF NOT EXISTS prefix_assignment_guild_id ON prefix_assignment(guild_id)"""
+    ]),
+    (3, 'create activity rollups', [
+        """CREATE TABLE IF NOT EXISTS
+        message_activity_hourly(guild_id INTEGER, user_id INTEGER, hour INTEGER, message_count INTEGER,
+        PRIMARY KEY(guild_id, user_id, hour)) WITHOUT ROWID""",
+        """CREATE INDEX IF NOT EXISTS message_activity_hourly_hour ON message_activity_hourly(hour)""",
+        """CREATE TABLE IF NOT EXISTS
+        message_activity_daily(guild_id INTEGER, user_id INTEGER, day INTEGER, message_count INTEGER,
+        PRIMARY KEY(guild_id, user_id, day)) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS
+        message_activity_hour_of_day(guild_id INTEGER, user_id INTEGER, hour_of_day INTEGER, message_count INTEGER,
+        PRIMARY KEY(guild_id, user_id, hour_of_day)) WITHOUT ROWID"""
+    ]),
+    (4, 'create player_uuid', [
+        """CREATE TABLE IF NOT EXISTS
+        player_uuid(name TEXT PRIMARY KEY, uuid TEXT, fetched_at INTEGER) WITHOUT ROWID""",
+        """CREATE INDEX IF NOT EXISTS player_uuid_uuid ON player_uuid(uuid)"""
+    ]),
+    (5, 'create hycheck_player and hycheck_config', [
+        """CREATE TABLE IF NOT EXISTS
+        hycheck_player(player_uuid TEXT PRIMARY KEY, name TEXT, status TEXT, last_login INTEGER, last_logout INTEGER)
+        WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS
+        hycheck_config(id INTEGER PRIMARY KEY CHECK(id = 0), channel_id INTEGER, base_interval REAL,
+        ignore_exceptions INTEGER, running INTEGER)"""
+    ])
+]
+
+
+def run_migrations(database):
+    """applies the pragmas and all pending migrations to "databank.db"; call this once before the client is started"""
+    def migrate(connection):
+        for pragma in PRAGMAS:
+            connection.execute(pragma)
+
+        current_version = connection.execute('PRAGMA user_version').fetchone()[0]
+
+        for version, description, statements in MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            # every migration is applied in its own transaction, together with the new version number
+            connection.execute('BEGIN')
+            try:
+                for statement in statements:
+                    connection.execute(statement)
+
+                connection.execute(f'PRAGMA user_version = {int(version)}')
+                connection.execute('COMMIT')
+
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+
+            logger.info(f'applied migration {version}: {description}')
+            current_version = version
+
+        return current_version
+
+    schema_version = database.run_blocking(migrate)
+    logger.info(f'"databank.db" is at schema version {schema_version}')
@@ -0,0 +1,184 @@
+# imports
+import re
+import logging
+import asyncio
+from time import time
+from collections import OrderedDict
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+BULK_LOOKUP_URL = 'https://api.minecraftservices.com/minecraft/profile/lookup/bulk/byname'
+BULK_LOOKUP_SIZE = 10    # names per request, the maximum accepted by mojang
+PLAYER_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_]{1,16}$')
+
+
+class UnknownPlayerError(KeyError):
+    """raised if no minecraft account has the given name"""
+
+
+# uuid resolver
+class UuidResolver:
+    """resolves minecraft player names to uuids, backed by the "player_uuid" table in "databank.db"
+
+    names that are neither in memory nor in "databank.db" are collected for "batch_delay" seconds and
+    looked up with one bulk request per ten names; concurrent lookups of the same name share one request
+    """
+    def __init__(self, database, http_client, ttl=604800, missing_ttl=3600, batch_delay=0.05, max_cache_size=4096):
+        self.database = database
+        self.http_client = http_client
+        self.ttl = ttl    # seconds, names can be changed every 30 days
+        self.missing_ttl = missing_ttl    # seconds, for names without an account
+        self.batch_delay = batch_delay    # seconds
+        self.max_cache_size = max_cache_size
+
+        self.cache = OrderedDict()    # {lowercase name: (expires at, uuid or None), ...}
+        self.pending = {}    # {lowercase name: future, ...} of the names waiting for the next bulk request
+        self.batch_tasks = set()    # keeps references to the running batches, so they are not garbage collected
+
+        # metrics
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.coalesced = 0
+        self.requests = 0
+        self.fetched = 0
+
+    def remember(self, name, uuid, expires_at):
+        """stores a lookup in memory, the least recently used names are dropped first"""
+        self.cache[name] = (expires_at, uuid)
+        self.cache.move_to_end(name)
+
+        while len(self.cache) > self.max_cache_size:
+            self.cache.popitem(last=False)
+
+    def get_expiry(self, uuid, fetched_at):
+        """returns when a lookup has to be repeated"""
+        return fetched_at + (self.ttl if uuid is not None else self.missing_ttl)
+
+    async def get_uuids(self, names):
+        """returns {name: uuid or None, ...} for the given names, None if no account has the name"""
+        now = time()
+        results = {}
+        missing = []
+
+        # memory
+        for name in dict.fromkeys(name.lower() for name in names):
+            if not PLAYER_NAME_PATTERN.match(name):
+                # mojang rejects the whole request if it contains an invalid name
+                results[name] = None
+                continue
+
+            cached = self.cache.get(name)
+
+            if cached is not None and cached[0] > now:
+                self.cache.move_to_end(name)
+                self.memory_hits += 1
+                results[name] = cached[1]
+            else:
+                missing.append(name)
+
+        # databank.db
+        if missing:
+            sql = f"""SELECT name, uuid, fetched_at FROM player_uuid WHERE name IN ({', '.join('?' * len(missing))})"""
+
+            # one label for every number of names, so the query statistics are not split up
+            rows = await self.database.run(lambda connection: connection.execute(sql, missing).fetchall(),
+                                           """SELECT name, uuid, fetched_at FROM player_uuid WHERE name IN (...)""")
+
+            for name, uuid, fetched_at in rows:
+                expires_at = self.get_expiry(uuid, fetched_at)
+
+                if expires_at > now:
+                    self.remember(name, uuid, expires_at)
+                    self.database_hits += 1
+                    results[name] = uuid
+
+            missing = [name for name in missing if name not in results]
+
+        # mojang
+        if missing:
+            futures = []
+
+            for name in missing:
+                future = self.pending.get(name)
+
+                if future is None:
+                    if not self.pending:
+                        # the first name of a new batch, the batch is sent after "batch_delay" seconds
+                        self.batch_tasks.add(asyncio.create_task(self.fetch_pending()))
+
+                    future = self.pending[name] = asyncio.get_running_loop().create_future()
+                else:
+                    self.coalesced += 1
+
+                futures.append(future)
+
+            for name, uuid in zip(missing, await asyncio.gather(*futures)):
+                results[name] = uuid
+
+        return {name: results[name.lower()] for name in names}
+
+    async def get_uuid(self, name):
+        """returns the uuid of a player name, raises UnknownPlayerError if no account has the name"""
+        uuid = (await self.get_uuids([name]))[name]
+
+        if uuid is None:
+            raise UnknownPlayerError(name)
+
+        return uuid
+
+    async def fetch_pending(self):
+        """waits for more names and then looks up all pending names, ten per request"""
+        await asyncio.sleep(self.batch_delay)
+
+        pending, self.pending = self.pending, {}
+        names = list(pending)
+
+        await asyncio.gather(*(self.fetch(names[index:index + BULK_LOOKUP_SIZE], pending)
+                               for index in range(0, len(names), BULK_LOOKUP_SIZE)))
+
+        self.batch_tasks.discard(asyncio.current_task())
+
+    async def fetch(self, names, pending):
+        """looks up up to ten names with one bulk request and stores the results"""
+        try:
+            self.requests += 1
+            profiles = await self.http_client.post_json(BULK_LOOKUP_URL, names)
+
+            uuids = dict.fromkeys(names)
+            for profile in profiles or []:
+                uuids[profile['name'].lower()] = profile['id']
+
+            fetched_at = int(time())
+            await self.database.executemany(
+                """INSERT OR REPLACE INTO player_uuid(name, uuid, fetched_at) VALUES(?, ?, ?)""",
+                [(name, uuid, fetched_at) for name, uuid in uuids.items()])
+
+        except Exception as e:
+            for name in names:
+                if not pending[name].done():
+                    pending[name].set_exception(e)
+
+            return
+
+        self.fetched += len(names)
+
+        for name in names:
+            self.remember(name, uuids[name], self.get_expiry(uuids[name], fetched_at))
+
+            if not pending[name].done():
+                pending[name].set_result(uuids[name])
+
+    def stats(self):
+        """returns the number of lookups answered from memory, "databank.db" and mojang"""
+        return {
+            'cached': len(self.cache),
+            'memory_hits': self.memory_hits,
+            'database_hits': self.database_hits,
+            'coalesced': self.coalesced,
+            'requests': self.requests,
+            'fetched': self.fetched
+        }
@@ -0,0 +1,133 @@
+# imports
+import logging
+from time import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    """normalizes a search query, so "Never Gonna  Give You Up" and "never gonna give you up" share one cache entry"""
+    return ' '.join(query.lower().split())
+
+
+def get_stream_url_expiry(url, default_ttl):
+    """returns the unix timestamp a signed stream url expires at, read from its "expire" parameter if it has one"""
+    try:
+        return int(parse_qs(urlparse(url).query)['expire'][0])
+
+    except (KeyError, IndexError, ValueError):
+        return time() + default_ttl
+
+
+# search cache
+class SearchCache:
+    """maps normalized search queries to video metadata ({'id', 'title', 'duration'}), least recently used are dropped"""
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+
+        self.entries = OrderedDict()    # {normalized_query: {'id': video_id, 'title': title, 'duration': seconds}, ...}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        """returns the metadata of the video a query resolved to, or None"""
+        key = normalize_query(query)
+        metadata = self.entries.get(key)
+
+        if metadata is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        return metadata
+
+    def set(self, query, metadata):
+        """remembers the video a query resolved to"""
+        key = normalize_query(query)
+
+        self.entries[key] = metadata
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """returns size and hit rate of the cache"""
+        requests = self.hits + self.misses
+
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0
+        }
+
+
+# stream url cache
+class StreamUrlCache:
+    """maps video ids to signed stream urls until shortly before the urls expire"""
+    def __init__(self, max_size=1024, safety_margin=600, default_ttl=3600):
+        self.max_size = max_size
+        self.safety_margin = safety_margin    # seconds, urls this close to their expiry are not handed out anymore
+        self.default_ttl = default_ttl    # seconds, for urls without an "expire" parameter
+
+        self.entries = OrderedDict()    # {video_id: (url, expires_at), ...}
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def is_fresh(self, url):
+        """checks whether a stream url can still be used for a whole playback"""
+        return get_stream_url_expiry(url, self.default_ttl) - self.safety_margin > time()
+
+    def get(self, video_id):
+        """returns a stream url that does not expire within the safety margin, or None"""
+        entry = self.entries.get(video_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        url, expires_at = entry
+        if expires_at - self.safety_margin <= time():
+            # refresh expired urls instead of letting ffmpeg fail mid-playback
+            del self.entries[video_id]
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(video_id)
+        self.hits += 1
+
+        return url
+
+    def set(self, video_id, url):
+        """remembers the stream url of a video until it expires"""
+        self.entries[video_id] = (url, get_stream_url_expiry(url, self.default_ttl))
+        self.entries.move_to_end(video_id)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """returns size and hit rate of the cache"""
+        requests = self.hits + self.misses
+
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'hit_rate': self.hits / requests if requests else 0.0
+        }
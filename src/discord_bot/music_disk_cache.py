@@ -0,0 +1,202 @@
+# imports
+import os
+import logging
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# audio disk cache
+class AudioDiskCache:
+    """content-addressed Ogg/Opus files of the most played tracks, least recently played are evicted first
+
+    local files are addressed by the hash of their content and YouTube videos by the hash of their video id;
+    a track is only encoded once it has been played "min_plays" times, so one-off requests do not evict popular tracks
+    """
+    def __init__(self, directory, max_size=2 * 1024 ** 3, min_plays=2, bitrate=128, max_tracked_plays=10000):
+        self.directory = directory
+        self.max_size = max_size    # bytes
+        self.min_plays = min_plays
+        self.bitrate = bitrate    # kbit/s
+
+        self.entries = OrderedDict()    # {key: file size in bytes, ...}, least recently played first
+        self.size = 0    # bytes
+
+        self.plays = {}    # {key: times played, ...} of tracks that are not cached yet
+        self.max_tracked_plays = max_tracked_plays
+        self.encoding = set()    # keys of tracks that are being encoded right now
+        self.encode_semaphore = asyncio.Semaphore(1)    # encode one track at a time, playback needs the cpu more
+        self.file_hashes = {}    # {(path, modification time, size): hash of the content, ...}
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def load(self):
+        """reads the cached files from the cache directory once; call this before the cache is used"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.ogg'):
+                stat = entry.stat()
+                files.append((stat.st_atime, entry.name[:-4], stat.st_size))
+
+            elif entry.name.endswith('.tmp'):
+                # left over from an interrupted encoding
+                os.remove(entry.path)
+
+        for access_time, key, size in sorted(files):
+            self.entries[key] = size
+            self.size += size
+
+        logger.info(f'found {len(self.entries)} cached audio files ({self.size / 1024 ** 2:.1f} MiB)')
+
+        self.evict()
+
+    def get_path(self, key):
+        """returns the path of the cached file of a key"""
+        return os.path.join(self.directory, f'{key}.ogg')
+
+    def hash_file(self, path):
+        """returns the hash of the content of a local file; hashes are remembered until the file is changed"""
+        stat = os.stat(path)
+        identity = (path, stat.st_mtime, stat.st_size)
+
+        file_hash = self.file_hashes.get(identity)
+        if file_hash is None:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+
+            file_hash = self.file_hashes[identity] = digest.hexdigest()
+
+        return file_hash
+
+    async def get_key(self, track):
+        """returns the cache key of a track"""
+        if track.id is not None:
+            return hashlib.sha256(f'youtube:{track.id}'.encode()).hexdigest()
+
+        # reading a large file would block the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.hash_file, track.source)
+
+    def lookup(self, key):
+        """returns the path of the cached file of a key, or None; neither the statistics nor the recency are changed"""
+        if key not in self.entries:
+            return None
+
+        path = self.get_path(key)
+
+        # the file may have been deleted by hand
+        return path if os.path.exists(path) else None
+
+    def record_play(self, key, track, before_options=''):
+        """counts a track that has started playing; cached tracks become the most recently played, tracks that are not
+        cached yet are encoded in the background once they are popular"""
+        if key in self.entries:
+            try:
+                # keep the recency across restarts
+                os.utime(self.get_path(key))
+
+            except OSError:
+                # the file has been deleted by hand
+                self.size -= self.entries.pop(key)
+
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return
+
+        self.misses += 1
+
+        if key in self.encoding:
+            return
+
+        plays = self.plays.get(key, 0) + 1
+
+        if plays < self.min_plays:
+            self.plays[key] = plays
+
+            if len(self.plays) > self.max_tracked_plays:
+                # forget the track that was counted first
+                del self.plays[next(iter(self.plays))]
+
+            return
+
+        self.plays.pop(key, None)
+        self.encoding.add(key)
+        asyncio.get_running_loop().create_task(self.store(key, track.source, before_options))
+
+    async def store(self, key, source, before_options=''):
+        """encodes a source to an Ogg/Opus file in the cache directory"""
+        path = self.get_path(key)
+        temporary_path = f'{path}.tmp'
+
+        try:
+            async with self.encode_semaphore:
+                process = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-y', *before_options.split(), '-i', source,
+                    '-vn', '-map_metadata', '-1', '-c:a', 'libopus', '-b:a', f'{self.bitrate}k',
+                    '-ar', '48000', '-ac', '2', '-f', 'ogg', '-loglevel', 'error', temporary_path,
+                    stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                stdout, stderr = await process.communicate()
+
+            if process.returncode != 0:
+                logger.warning(f'could not encode "{source}" for the audio cache: "{stderr.decode().strip()}"')
+                return
+
+            os.replace(temporary_path, path)
+
+            size = os.path.getsize(path)
+            self.entries[key] = size
+            self.size += size
+            self.stored += 1
+
+            self.evict()
+
+        except Exception as e:
+            logger.exception(e)
+
+        finally:
+            self.encoding.discard(key)
+
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def evict(self):
+        """deletes the least recently played files until the cache fits into its maximum size"""
+        while self.size > self.max_size and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+            self.evicted += 1
+
+            try:
+                os.remove(self.get_path(key))
+
+            except OSError as e:
+                logger.warning(f'could not delete cached audio file {key}: "{e}"')
+
+    def stats(self):
+        """returns size and hit rate of the cache"""
+        requests = self.hits + self.misses
+
+        return {
+            'files': len(self.entries),
+            'size': self.size,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'stored': self.stored,
+            'evicted': self.evicted
+        }
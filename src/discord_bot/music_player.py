@@ -0,0 +1,524 @@
+# imports
+import os
+import logging
+import asyncio
+import discord
+from time import monotonic
+from music_queue import MusicQueue
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+def get_process_cpu_time(pid):
+    """returns the cpu time (user + system) a process has used in seconds, or None if it can not be read (not linux)"""
+    try:
+        with open(f'/proc/{pid}/stat') as file:
+            # the fields after the process name, which may contain spaces itself
+            fields = file.read().rsplit(')', 1)[1].split()
+
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+# player states
+IDLE = 'idle'    # nothing is playing, the consumer waits to be started
+PLAYING = 'playing'
+PAUSED = 'paused'
+
+
+# music player
+class MusicPlayer:
+    """voice client, queue and volume of one guild
+
+    all state changes happen on the event loop: a single consumer task takes the tracks from the queue one after another;
+    the audio thread only reports the end of a track, so skipping and enqueuing can never start two tracks at once
+    """
+    def __init__(self, client, guild_id, resolver, ffmpeg_options, disk_cache=None, prefetch_depth=3):
+        self.client = client
+        self.guild_id = guild_id
+        self.resolver = resolver
+        self.ffmpeg_options = ffmpeg_options
+        self.disk_cache = disk_cache    # AudioDiskCache or None
+        self.prefetch_depth = prefetch_depth    # number of upcoming tracks whose stream urls are kept fresh
+
+        self.voice_client = None
+
+        self.queue = MusicQueue()
+        self.volume = 1.0    # floating point percentage
+
+        # state machine
+        self.state = IDLE
+        self.current = None    # the track that is playing or paused
+        self.consumer = None    # asyncio.Task taking the tracks from the queue
+        self.wakeup = asyncio.Event()    # set to make an idle consumer start playing
+        self.track_finished = asyncio.Event()    # set when the audio thread has finished a track
+
+        # the audio source of the current track, to restart it at the current position when the volume changes
+        self.source = None
+        self.source_opened_at = None    # monotonic time the ffmpeg process of the source was started
+        self.source_offset = 0.0    # seconds into the track the source started at
+        self.source_started_at = None    # monotonic time the source started playing
+        self.paused_at = None
+        self.paused_total = 0.0    # seconds the source has been paused
+
+        # imported playlist entries that are being resolved in the background
+        self.import_tasks = set()
+
+        # look-ahead: the next track's audio source is opened while the current track is playing
+        self.prepared = None    # (track, audio source, volume, monotonic time the source was opened) or None
+        self.prefetch_lock = asyncio.Lock()
+
+        self.prefetched = 0    # transitions that used a prepared source
+        self.cold_starts = 0    # transitions that had to open the source first
+        self.passthrough = 0    # sources whose opus stream is passed through without decoding
+        self.transcoded = 0    # sources that are encoded to opus by ffmpeg
+
+        self.last_active = monotonic()
+
+    def touch(self):
+        """marks the player as used, so it is not reclaimed"""
+        self.last_active = monotonic()
+
+    def is_idle(self):
+        """checks whether the player neither plays nor has anything queued"""
+        return self.state == IDLE and not self.queue
+
+    def get_stream_options(self, track):
+        """returns the ffmpeg input options for the source of a track"""
+        # do not try to reconnect to a stream when playing local files
+        if track.source is not None and (track.source.startswith('http://') or track.source.startswith('https://')):
+            return self.ffmpeg_options['before_options']
+
+        return ''
+
+    async def get_cached_path(self, track):
+        """returns the path of the cached file of a track, or None; the statistics of the disk cache are not changed"""
+        if self.disk_cache is None:
+            return None
+
+        return self.disk_cache.lookup(await self.disk_cache.get_key(track))
+
+    async def open_source(self, track, start=0.0):
+        """opens an opus audio source for a track, starting "start" seconds into it
+
+        opus streams are passed through without decoding; other codecs and volumes other than 100% are encoded by ffmpeg
+        (with a volume filter), so no audio frame is ever decoded, scaled or encoded in python;
+        tracks in the disk cache are played from the cached file
+        """
+        # seek the input instead of decoding everything up to the position
+        seek_options = f'-ss {start:.2f} ' if start else ''
+
+        options = self.ffmpeg_options['options']
+        if self.volume != 1.0:
+            options = f'{options} -filter:a volume={self.volume}'
+
+        path = await self.get_cached_path(track)
+
+        if path is not None:
+            # cached files are opus already, there is nothing to decode or download
+            if self.volume == 1.0:
+                self.passthrough += 1
+            else:
+                self.transcoded += 1
+
+            return discord.FFmpegOpusAudio(path, codec='copy' if self.volume == 1.0 else None,
+                                           before_options=seek_options, options=options)
+
+        stream_options = self.get_stream_options(track)
+
+        if self.volume == 1.0:
+            try:
+                codec, bitrate = await discord.FFmpegOpusAudio.probe(track.source)
+            except Exception as e:
+                logger.warning(f'could not probe "{track.title}", it will be transcoded: "{e}"')
+                codec, bitrate = None, None
+        else:
+            codec, bitrate = None, None
+
+        if codec == 'opus':
+            self.passthrough += 1
+        else:
+            self.transcoded += 1
+
+        return discord.FFmpegOpusAudio(track.source, bitrate=bitrate, codec=codec,
+                                       before_options=f'{seek_options}{stream_options}', options=options)
+
+    def take_prepared(self, track):
+        """returns the prepared audio source and the time it was opened if it belongs to the given track and was
+        opened with the current volume, else None; discards stale sources"""
+        prepared, self.prepared = self.prepared, None
+
+        if prepared is None:
+            return None
+
+        prepared_track, source, volume, opened_at = prepared
+        if prepared_track is not track or volume != self.volume:
+            # the queue or the volume has been changed since the source was prepared
+            source.cleanup()
+            return None
+
+        return source, opened_at
+
+    def get_position(self):
+        """returns the number of seconds the current track has been playing for"""
+        if self.source_started_at is None:
+            return 0.0
+
+        paused = self.paused_total + (monotonic() - self.paused_at if self.paused_at is not None else 0.0)
+
+        return self.source_offset + monotonic() - self.source_started_at - paused
+
+    def get_cpu_usage(self):
+        """returns the share of a cpu core the ffmpeg process of the current track uses, or None"""
+        if self.state == IDLE or self.source is None:
+            return None
+
+        # the library does not expose the ffmpeg process
+        process = getattr(self.source, '_process', None)
+        cpu_time = get_process_cpu_time(process.pid) if process else None
+
+        if cpu_time is None:
+            return None
+
+        return cpu_time / max(monotonic() - self.source_opened_at, 1e-6)
+
+    def start_import(self, tracks):
+        """resolves imported placeholder tracks in the background, tracks that have left the queue are skipped"""
+        task = self.client.loop.create_task(self.resolver.resolve_all(tracks, lambda track: track in self.queue))
+
+        self.import_tasks.add(task)
+        task.add_done_callback(self.import_tasks.discard)
+
+    def cancel_imports(self):
+        """stops resolving imported playlist entries"""
+        for task in self.import_tasks:
+            task.cancel()
+
+        self.import_tasks.clear()
+
+    def schedule_prefetch(self):
+        """starts preparing the upcoming tracks in the background"""
+        self.client.loop.create_task(self.prefetch())
+
+    async def prefetch(self):
+        """refreshes the stream urls of the next tracks and opens the audio source of the very next one"""
+        async with self.prefetch_lock:
+            if self.state == IDLE:
+                # the consumer is about to take the first track and opens it itself, a prepared source would be
+                # thrown away; the consumer prefetches the following tracks once it plays
+                return
+
+            try:
+                upcoming = [track for position, track in self.queue.page(1, self.prefetch_depth)]
+
+                for track in upcoming:
+                    # cached tracks are played from the disk cache, their stream urls are not needed
+                    if await self.get_cached_path(track) is None:
+                        await self.resolver.refresh(track)
+
+                if not upcoming:
+                    return
+
+                next_track = upcoming[0]
+                if self.prepared is not None:
+                    if self.prepared[0] is next_track and self.prepared[2] == self.volume:
+                        return
+
+                    # the queue or the volume has been changed, the prepared source would never be played
+                    self.prepared[1].cleanup()
+                    self.prepared = None
+
+                if self.state == IDLE or (next_track.source is None and await self.get_cached_path(next_track) is None):
+                    return
+
+                volume = self.volume
+                source = await self.open_source(next_track)
+
+                if self.queue.peek() is next_track and self.prepared is None:
+                    self.prepared = (next_track, source, volume, monotonic())
+                else:
+                    # the queue has been changed while the source was opened
+                    source.cleanup()
+
+            except Exception as e:
+                # a failed prefetch only means the next track is opened when it is played
+                logger.exception(e)
+
+    # ------
+    # consumer
+    # ------
+
+    def after_track(self, error):
+        """called by the audio thread when a track has finished; hands the transition over to the event loop"""
+        asyncio.run_coroutine_threadsafe(self.finish_track(error), self.client.loop)
+
+    async def finish_track(self, error):
+        """wakes the consumer up for the next track"""
+        if error:
+            logger.error(f'playback error in guild {self.guild_id}: "{error}"')
+
+        self.track_finished.set()
+
+    async def connect(self, channel):
+        """connects to a voice channel or moves there; returns False if the channel can not be joined"""
+        if not self.voice_client or not self.voice_client.is_connected():
+            self.voice_client = await channel.connect()
+            # can not connect
+            if not self.voice_client:
+                return False
+
+        elif self.voice_client.channel != channel:
+            await self.voice_client.move_to(channel)
+
+        return True
+
+    async def consume(self):
+        """plays the tracks in the queue one after another until the player is disconnected"""
+        while True:
+            # remove the next track from the queue, so it won't be played forever
+            track = self.queue.pop()
+
+            if track is None:
+                self.state = IDLE
+                self.current = None
+
+                # wait until the next play command
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            self.touch()
+
+            try:
+                if not await self.connect(track.channel):
+                    logger.warning(f'could not connect to voice channel {track.channel} in guild {self.guild_id}')
+                    continue
+
+                prepared = self.take_prepared(track)
+
+                if prepared is not None:
+                    source, opened_at = prepared
+                    self.prefetched += 1
+
+                else:
+                    self.cold_starts += 1
+
+                    # queued stream urls may have expired in the meantime, playlist entries may not be resolved yet;
+                    # neither matters for tracks that are played from the disk cache
+                    if await self.get_cached_path(track) is None:
+                        await self.resolver.refresh(track)
+                        if track.source is None:
+                            logger.warning(f'skipping "{track.title}" in guild {self.guild_id}, '
+                                           f'it could not be resolved')
+                            continue
+
+                    source = await self.open_source(track)
+                    opened_at = monotonic()
+
+                self.track_finished.clear()
+                self.current = track
+                self.state = PLAYING
+                self.voice_client.play(source, after=self.after_track)
+                self.set_source(source, opened_at)
+
+            except Exception as e:
+                logger.exception(e)
+                continue
+
+            if self.disk_cache is not None:
+                # only tracks that have actually started playing count, not prepared sources that are thrown away or
+                # sources that are reopened with another volume
+                try:
+                    key = await self.disk_cache.get_key(track)
+                    self.disk_cache.record_play(key, track, self.get_stream_options(track))
+
+                except Exception as e:
+                    logger.exception(e)
+
+            # prepare the track after this one while this one is playing
+            self.schedule_prefetch()
+
+            await self.track_finished.wait()
+            self.touch()
+
+            self.source = None
+            self.source_started_at = None
+
+    async def play(self, ctx):
+        """connects to the voice channel of the first song in the queue and starts playing"""
+        self.touch()
+
+        if self.state != IDLE:
+            # the consumer continues with the queue on its own
+            return
+
+        track = self.queue.peek()
+
+        if track:
+            # connect here instead of in the consumer, so the command can report failing connections
+            if not await self.connect(track.channel):
+                await ctx.respond(f'{ctx.author.mention}, I was not able to connect to the given voice channel.\n'
+                                  f'(Voice Channel: `{track.channel}`)')
+                return
+
+            if self.consumer is None or self.consumer.done():
+                self.consumer = self.client.loop.create_task(self.consume())
+
+            self.wakeup.set()
+
+    def set_source(self, source, opened_at, offset=0.0):
+        """remembers the source that has just started playing, to keep track of the position in the track"""
+        self.source = source
+        self.source_opened_at = opened_at
+        self.source_offset = offset
+        self.source_started_at = monotonic()
+        self.paused_at = monotonic() if self.state == PAUSED else None
+        self.paused_total = 0.0
+
+    def pause(self):
+        """pauses the current track"""
+        if self.state == PLAYING and self.voice_client and self.voice_client.is_playing():
+            self.voice_client.pause()
+            self.state = PAUSED
+            self.paused_at = monotonic()
+
+    def resume(self):
+        """resumes the current track"""
+        if self.state == PAUSED and self.voice_client and self.voice_client.is_paused():
+            self.voice_client.resume()
+            self.state = PLAYING
+
+            if self.paused_at is not None:
+                self.paused_total += monotonic() - self.paused_at
+                self.paused_at = None
+
+    async def set_volume(self, volume):
+        """changes the volume; the current track is restarted at its current position with the new volume filter"""
+        self.volume = volume
+
+        if self.state == IDLE or self.current is None or self.source is None or not self.voice_client:
+            return
+
+        position = self.get_position()
+        source = await self.open_source(self.current, position)
+
+        if self.voice_client.source is not self.source:
+            # the track has ended while the new source was opened
+            source.cleanup()
+            return
+
+        old_source = self.source
+        self.voice_client.source = source
+        if self.state == PAUSED:
+            # swapping the source resumes playing
+            self.voice_client.pause()
+
+        self.set_source(source, monotonic(), position)
+
+        # the audio thread may still be reading the last frame of the old source
+        self.client.loop.call_later(1, old_source.cleanup)
+
+        # the prepared source of the next track still has the old volume
+        self.schedule_prefetch()
+
+    def skip(self):
+        """stops the current track; the consumer continues with the next one once the audio thread reports the end"""
+        if self.state != IDLE and self.voice_client:
+            self.voice_client.stop()
+
+    async def disconnect(self):
+        """stops playing, clears the queue and leaves the voice channel"""
+        self.queue.clear()
+        self.cancel_imports()
+
+        if self.consumer is not None:
+            self.consumer.cancel()
+            self.consumer = None
+
+        self.state = IDLE
+        self.current = None
+        self.source = None
+        self.source_started_at = None
+
+        if self.prepared is not None:
+            self.prepared[1].cleanup()
+            self.prepared = None
+
+        if self.voice_client:
+            if self.voice_client.is_playing() or self.voice_client.is_paused():
+                self.voice_client.stop()
+
+            if self.voice_client.is_connected():
+                await self.voice_client.disconnect()
+
+
+# player registry
+class PlayerRegistry:
+    """music players of all guilds; players are created on first use and reclaimed once they have been idle"""
+    def __init__(self, client, resolver, ffmpeg_options, disk_cache=None, idle_timeout=300):
+        self.client = client
+        self.resolver = resolver
+        self.ffmpeg_options = ffmpeg_options
+        self.disk_cache = disk_cache
+        self.idle_timeout = idle_timeout    # seconds
+
+        self.players = {}    # {guild_id: MusicPlayer, ...}
+
+        self.created = 0
+        self.reclaimed = 0
+
+    def get(self, guild_id):
+        """returns the player of a guild, creating it if necessary"""
+        player = self.players.get(guild_id)
+
+        if player is None:
+            player = self.players[guild_id] = MusicPlayer(self.client, guild_id, self.resolver, self.ffmpeg_options,
+                                                            self.disk_cache)
+            self.created += 1
+
+        player.touch()
+
+        return player
+
+    def peek(self, guild_id):
+        """returns the player of a guild without creating one, or None"""
+        return self.players.get(guild_id)
+
+    async def reclaim_idle(self):
+        """disconnects and removes players that have been idle for longer than the idle timeout"""
+        now = monotonic()
+
+        for guild_id, player in list(self.players.items()):
+            if player.is_idle() and now - player.last_active > self.idle_timeout:
+                await player.disconnect()
+                del self.players[guild_id]
+                self.reclaimed += 1
+
+                logger.info(f'reclaimed the idle music player of guild {guild_id}')
+
+    async def close(self):
+        """disconnects and removes all players"""
+        for player in self.players.values():
+            await player.disconnect()
+
+        self.players = {}
+
+    def stats(self):
+        """returns the number of players, how their tracks were opened and the cpu usage of every active stream"""
+        return {
+            'players': len(self.players),
+            'playing': sum(1 for player in self.players.values() if player.state != IDLE),
+            'created': self.created,
+            'reclaimed': self.reclaimed,
+            'prefetched': sum(player.prefetched for player in self.players.values()),
+            'cold_starts': sum(player.cold_starts for player in self.players.values()),
+            'passthrough': sum(player.passthrough for player in self.players.values()),
+            'transcoded': sum(player.transcoded for player in self.players.values()),
+            'cpu_usages': [cpu_usage for cpu_usage in (player.get_cpu_usage() for player in self.players.values())
+                           if cpu_usage is not None]
+        }
@@ -0,0 +1,130 @@
+# imports
+import logging
+import random
+from itertools import islice
+from collections import deque
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+def format_duration(seconds):
+    """formats seconds as h:mm:ss or m:ss, unknown durations as ?:??"""
+    if seconds is None:
+        return '?:??'
+
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f'{hours}:{minutes:02}:{seconds:02}' if hours else f'{minutes}:{seconds:02}'
+
+
+# track
+class Track:
+    """a queued song; uses slots, as long queues hold thousands of these"""
+    __slots__ = ('source', 'title', 'id', 'duration', 'channel')
+
+    def __init__(self, source, title, channel, id=None, duration=None):
+        self.source = source    # stream url or path to a local file
+        self.title = title
+        self.channel = channel    # the voice channel to play the track in
+        self.id = id    # YouTube video id, None for local files
+        self.duration = duration    # seconds, None if unknown
+
+    @classmethod
+    def from_song(cls, song, channel):
+        """creates a track from a song returned by the resolver"""
+        return cls(song['source'], song['title'], channel, song.get('id'), song.get('duration'))
+
+
+# music queue
+class MusicQueue:
+    """tracks waiting to be played; dequeuing the next track is O(1) and the total duration is kept up to date
+
+    positions are 1-based, like they are shown to users
+    """
+    def __init__(self):
+        self.tracks = deque()
+        self.total_duration = 0    # seconds, tracks with unknown duration are not counted
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __bool__(self):
+        return bool(self.tracks)
+
+    def __iter__(self):
+        return iter(self.tracks)
+
+    def __contains__(self, track):
+        return track in self.tracks
+
+    def check_position(self, position):
+        """raises IndexError if there is no track at the given position"""
+        if not 1 <= position <= len(self.tracks):
+            raise IndexError(f'there is no track at position {position}')
+
+    def append(self, track):
+        """adds a track to the end of the queue"""
+        self.tracks.append(track)
+        self.total_duration += track.duration or 0
+
+    def peek(self):
+        """returns the next track without removing it, or None"""
+        return self.tracks[0] if self.tracks else None
+
+    def pop(self):
+        """removes and returns the next track, or None"""
+        if not self.tracks:
+            return None
+
+        track = self.tracks.popleft()
+        self.total_duration -= track.duration or 0
+
+        return track
+
+    def remove(self, position):
+        """removes and returns the track at the given position"""
+        self.check_position(position)
+
+        track = self.tracks[position - 1]
+        del self.tracks[position - 1]
+        self.total_duration -= track.duration or 0
+
+        return track
+
+    def move(self, position, new_position):
+        """moves the track at the given position to a new position and returns it"""
+        self.check_position(position)
+        self.check_position(new_position)
+
+        track = self.tracks[position - 1]
+        del self.tracks[position - 1]
+        self.tracks.insert(new_position - 1, track)
+
+        return track
+
+    def shuffle(self):
+        """shuffles the queue"""
+        tracks = list(self.tracks)
+        random.shuffle(tracks)
+        self.tracks = deque(tracks)
+
+    def clear(self):
+        """removes all tracks"""
+        self.tracks.clear()
+        self.total_duration = 0
+
+    def page_count(self, page_size):
+        """returns the number of pages, an empty queue has one (empty) page"""
+        return max(1, -(-len(self.tracks) // page_size))
+
+    def page(self, page, page_size):
+        """returns [(position, track), ...] of the given 1-based page"""
+        start = (page - 1) * page_size
+        stop = min(start + page_size, len(self.tracks))
+
+        # indexing a deque is O(n) towards its middle, so slice it in one pass instead
+        return list(enumerate(islice(self.tracks, start, stop), start=start + 1))
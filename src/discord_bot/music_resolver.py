@@ -0,0 +1,209 @@
+# imports
+import logging
+import asyncio
+from time import perf_counter
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from youtube_dl import YoutubeDL
+from music_cache import SearchCache, StreamUrlCache
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# youtube resolver
+class YoutubeResolver:
+    """resolves YouTube search queries on a bounded thread pool, so "extract_info" never blocks the event loop"""
+    def __init__(self, ydl_options, max_workers=4, timeout=20, max_playlist_size=500, import_concurrency=2):
+        self.ydl_options = ydl_options
+        self.timeout = timeout    # seconds
+        self.max_playlist_size = max_playlist_size
+
+        # playlist imports resolve in the background and may only use some of the workers, so searches stay fast
+        self.import_semaphore = asyncio.Semaphore(import_concurrency)
+
+        # popular queries are only extracted once, stream urls are reused until they expire
+        self.search_cache = SearchCache()
+        self.stream_url_cache = StreamUrlCache()
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='youtube')
+        self.semaphore = asyncio.Semaphore(max_workers)    # at most one resolution per worker at a time
+
+        # metrics
+        self.waiting = 0    # queue depth: resolutions waiting for a free worker
+        self.running = 0    # including timed out resolutions whose worker thread has not finished yet
+        self.resolved = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.total_latency = 0.0    # seconds
+        self.max_latency = 0.0    # seconds
+
+    def _extract(self, target):
+        """extracts a search query ("ytsearch:...") or video url; runs on a worker thread"""
+        with YoutubeDL(self.ydl_options) as ydl:
+            info = ydl.extract_info(target, download=False)
+            if 'entries' in info:
+                info = info['entries'][0]
+
+            return {'source': info['formats'][0]['url'], 'title': info['title'],
+                    'id': info['id'], 'duration': info.get('duration')}
+
+    def _extract_playlist(self, url):
+        """lists the entries of a playlist without extracting every video (flat extraction); runs on a worker thread"""
+        options = {**self.ydl_options, 'noplaylist': False, 'extract_flat': 'in_playlist',
+                   'playlistend': self.max_playlist_size}
+
+        with YoutubeDL(options) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+            return [{'id': entry['id'], 'title': entry.get('title') or entry['id'], 'duration': entry.get('duration')}
+                    for entry in info.get('entries') or [] if entry and entry.get('id')]
+
+    async def _resolve(self, target, extract=None, timeout=None):
+        """runs an extraction (by default "_extract") on the thread pool; returns the result if successful, else False"""
+        extract = extract or self._extract
+        timeout = timeout or self.timeout
+
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        loop = asyncio.get_running_loop()
+        start = perf_counter()
+
+        def release(future):
+            """frees the worker slot once the worker thread has finished, even if the caller has given up on it"""
+            self.running -= 1
+            self.semaphore.release()
+
+            if not future.cancelled():
+                # mark the exception of abandoned extractions as retrieved
+                future.exception()
+
+        try:
+            future = loop.run_in_executor(self.executor, extract, target)
+        except Exception:
+            self.running -= 1
+            self.semaphore.release()
+            raise
+
+        future.add_done_callback(release)
+
+        try:
+            # the shield keeps the future (and therefore the slot) alive until the thread has finished
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+            self.resolved += 1
+            return result
+
+        except asyncio.TimeoutError:
+            # the worker thread can not be interrupted, it finishes in the background and keeps its slot until then
+            logger.warning(f'resolving "{target}" took longer than {timeout}s')
+            self.timeouts += 1
+            return False
+
+        except Exception as e:
+            logger.exception(e)
+            self.failed += 1
+            return False
+
+        finally:
+            latency = perf_counter() - start
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def _remember(self, query, song):
+        """caches the metadata and the stream url of a resolved song"""
+        if query is not None:
+            self.search_cache.set(query, {'id': song['id'], 'title': song['title'], 'duration': song['duration']})
+
+        self.stream_url_cache.set(song['id'], song['source'])
+
+    async def search(self, query):
+        """searches YouTube for a query and returns playback url and title if successful, else False"""
+        metadata = self.search_cache.get(query)
+
+        if metadata is None:
+            song = await self._resolve('ytsearch:%s' % query)
+            if song:
+                self._remember(query, song)
+
+            return song
+
+        # the query has been searched before, only the stream url might have to be extracted again
+        source = self.stream_url_cache.get(metadata['id'])
+        if source is not None:
+            return {'source': source, **metadata}
+
+        song = await self._resolve(f'https://www.youtube.com/watch?v={metadata["id"]}')
+        if song:
+            self._remember(None, song)
+
+        return song
+
+    async def refresh(self, track):
+        """resolves placeholder tracks and replaces stream urls that expire soon; local files are left unchanged"""
+        if track.id is None or (track.source is not None and self.stream_url_cache.is_fresh(track.source)):
+            return track
+
+        source = self.stream_url_cache.get(track.id)
+        if source is None:
+            song = await self._resolve(f'https://www.youtube.com/watch?v={track.id}')
+            if song:
+                self._remember(None, song)
+                source = song['source']
+
+        if source is not None:
+            track.source = source
+
+        return track
+
+    @staticmethod
+    def is_playlist(query):
+        """checks whether a query is the url of a YouTube playlist"""
+        url = urlparse(query)
+        query_parameters = parse_qs(url.query)
+
+        # links to a video inside a playlist or a mix (youtu.be links always point to a video) only play that video
+        return url.netloc.endswith('youtube.com') and 'list' in query_parameters and 'v' not in query_parameters
+
+    async def list_playlist(self, url):
+        """returns the entries of a playlist ([{'id', 'title', 'duration'}, ...]) if successful, else False"""
+        # listing a long playlist takes several requests
+        entries = await self._resolve(url, self._extract_playlist, self.timeout * 3)
+
+        return entries if entries else False
+
+    async def resolve_all(self, tracks, is_wanted=None):
+        """resolves placeholder tracks in the background, with at most "import_concurrency" at a time;
+        tracks for which "is_wanted" returns False when it is their turn are skipped"""
+        async def resolve(track):
+            async with self.import_semaphore:
+                if is_wanted is None or is_wanted(track):
+                    await self.refresh(track)
+
+        await asyncio.gather(*(resolve(track) for track in tracks))
+
+    def stats(self):
+        """returns queue depth, resolution latency and cache metrics"""
+        finished = self.resolved + self.failed + self.timeouts
+
+        return {
+            'waiting': self.waiting,
+            'running': self.running,
+            'resolved': self.resolved,
+            'failed': self.failed,
+            'timeouts': self.timeouts,
+            'average_latency': self.total_latency / finished if finished else 0.0,
+            'max_latency': self.max_latency,
+            'search_cache': self.search_cache.stats(),
+            'stream_url_cache': self.stream_url_cache.stats()
+        }
+
+    def close(self):
+        """shuts down the worker threads without waiting for running resolutions"""
+        self.executor.shutdown(wait=False)
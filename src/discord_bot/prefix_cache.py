@@ -0,0 +1,128 @@
+# imports
+import logging
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# prefix matcher
+class PrefixMatcher:
+    """precompiled prefixes of one guild (mention forms included), indexed by their first character
+
+    messages that do not start with any prefix are rejected with one dictionary lookup
+    """
+    def __init__(self, prefixes, user_id):
+        # same order as commands.when_mentioned_or, so the list can still be used for displaying the prefixes
+        self.prefix_list = [f'<@{user_id}> ', f'<@!{user_id}> ', *prefixes]
+
+        # longest prefixes first, so e.g. "b." is preferred over "b"
+        index = {}
+        for prefix in sorted(set(self.prefix_list), key=len, reverse=True):
+            index.setdefault(prefix[:1], []).append(prefix)
+
+        self.index = {first_character: tuple(prefixes) for first_character, prefixes in index.items()}
+
+    def match(self, content):
+        """returns the prefix the content starts with or None"""
+        for prefix in self.index.get(content[:1], ()):
+            if content.startswith(prefix):
+                return prefix
+
+        # an empty prefix matches everything
+        if '' in self.index:
+            return ''
+
+        return None
+
+
+# prefix cache
+class PrefixCache:
+    """resident guild -> prefix tuple cache, so "get_prefix" does not have to query "databank.db" for every message"""
+    def __init__(self, database, default_prefixes):
+        self.database = database
+        self.default_prefixes = tuple(default_prefixes)
+
+        self.prefixes = {}    # {guild_id: (prefix, ...), ...}
+        self.matchers = {}    # {guild_id: PrefixMatcher, ...}, guild_id is None for direct messages
+        self.loaded = False
+
+        # hits: lookups answered from memory, misses: lookups that had to read "databank.db"
+        self.hits = 0
+        self.misses = 0
+        self.matcher_builds = 0
+
+    def load(self):
+        """reads all custom prefixes from "databank.db" once and keeps them in memory"""
+        rows = self.database.fetchall_blocking("""SELECT guild_id, guild_prefix FROM prefix_assignment""")
+
+        # group the prefixes by guild id
+        prefixes = {}
+        for guild_id, guild_prefix in rows:
+            prefixes.setdefault(guild_id, []).append(guild_prefix)
+
+        self.prefixes = {guild_id: tuple(prefix_list) for guild_id, prefix_list in prefixes.items()}
+        self.loaded = True
+
+        logger.info(f'loaded custom prefixes for {len(self.prefixes)} guilds into the prefix cache')
+
+    def get(self, guild_id):
+        """returns the prefixes for a guild, the default prefixes are returned if there are no custom prefixes"""
+        if not self.loaded:
+            self.misses += 1
+            self.load()
+        else:
+            self.hits += 1
+
+        return self.prefixes.get(guild_id, self.default_prefixes)
+
+    def matcher(self, guild_id, user_id):
+        """returns the compiled prefix matcher for a guild, it is only rebuilt when the prefixes change"""
+        matcher = self.matchers.get(guild_id)
+
+        if matcher is None:
+            prefixes = self.get(guild_id) if guild_id is not None else self.default_prefixes
+            matcher = self.matchers[guild_id] = PrefixMatcher(prefixes, user_id)
+            self.matcher_builds += 1
+
+        else:
+            self.hits += 1
+
+        return matcher
+
+    async def set(self, guild_id, prefix_list):
+        """replaces the custom prefixes of a guild in "databank.db" and in the cache (write-through)"""
+        def replace_prefixes(connection):
+            # delete existing prefix assignments
+            connection.execute("""DELETE FROM prefix_assignment WHERE guild_id = ?""", (guild_id,))
+
+            # make a new entry for every prefix with the corresponding guild id
+            connection.executemany("""INSERT INTO prefix_assignment(guild_id, guild_prefix) VALUES(?, ?)""",
+                                   [(guild_id, prefix) for prefix in prefix_list])
+
+        await self.database.run(replace_prefixes)
+
+        # update the cache only after the changes were committed
+        self.prefixes[guild_id] = tuple(prefix_list)
+        self.matchers.pop(guild_id, None)
+
+    async def reset(self, guild_id):
+        """deletes the custom prefixes of a guild in "databank.db" and in the cache (write-through)"""
+        await self.database.execute("""DELETE FROM prefix_assignment WHERE guild_id = ?""", (guild_id,))
+
+        # update the cache only after the changes were committed
+        self.prefixes.pop(guild_id, None)
+        self.matchers.pop(guild_id, None)
+
+    def stats(self):
+        """returns the hit/ miss counters of the cache"""
+        lookups = self.hits + self.misses
+
+        return {
+            'guilds': len(self.prefixes),
+            'hits': self.hits,
+            'misses': self.misses,
+            'matcher_builds': self.matcher_builds,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,87 @@
+# imports
+import logging
+import asyncio
+from time import monotonic
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# token bucket
+class TokenBucket:
+    """limits requests to "rate" per "period" seconds, tokens are refilled continuously up to "capacity"
+
+    the quota reported by an api can be applied with "update" and "block", so the bucket never gets ahead of the api
+    """
+    def __init__(self, rate, period=60, capacity=None):
+        self.rate = rate
+        self.period = period    # seconds
+        self.capacity = capacity if capacity is not None else rate
+
+        self.tokens = float(self.capacity)
+        self.updated = monotonic()
+        self.blocked_until = 0.0    # monotonic time, no tokens are handed out before it
+        self.lock = asyncio.Lock()    # waiting callers are served in order
+
+        # metrics
+        self.acquired = 0
+        self.waited = 0.0    # seconds
+        self.blocked = 0
+
+    def refill(self):
+        """adds the tokens for the time passed since the last refill"""
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / self.period)
+        self.updated = now
+
+    async def acquire(self):
+        """waits until a token is available and takes it"""
+        async with self.lock:
+            while True:
+                self.refill()
+                now = monotonic()
+
+                if self.blocked_until > now:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.acquired += 1
+                    return
+                else:
+                    delay = (1 - self.tokens) * self.period / self.rate
+
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+    def update(self, remaining=None, reset=None):
+        """applies the remaining requests and the seconds until the quota resets as reported by the api"""
+        if remaining is None:
+            return
+
+        self.refill()
+        self.tokens = min(self.tokens, remaining)
+
+        if remaining <= 0 and reset:
+            self.block(reset)
+
+    def block(self, seconds):
+        """hands out no tokens for the given number of seconds, e.g. after a "Retry-After" header"""
+        logger.warning(f'rate limit reached, waiting {seconds}s')
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, monotonic() + seconds)
+        self.blocked += 1
+
+    def stats(self):
+        """returns the available tokens and the number of acquired tokens, waited seconds and blocks"""
+        self.refill()
+
+        return {
+            'rate': self.rate,
+            'period': self.period,
+            'tokens': int(self.tokens),
+            'acquired': self.acquired,
+            'waited': self.waited,
+            'blocked': self.blocked
+        }
@@ -0,0 +1,147 @@
+# imports
+import logging
+import asyncio
+import heapq
+from time import monotonic
+
+
+# logging
+"""create logger by inheriting configuration from root logger"""
+logger = logging.getLogger(__name__)
+
+
+# human member counts
+class HumanMemberCounts:
+    """number of members that are not bots per voice channel, counted once and then kept up to date by voice events"""
+    def __init__(self):
+        self.counts = {}    # {channel_id: number of human members, ...}
+
+    def get(self, channel):
+        """returns the number of human members in a voice channel"""
+        count = self.counts.get(channel.id)
+
+        if count is None:
+            count = self.recount(channel)
+
+        return count
+
+    def recount(self, channel):
+        """counts the human members of a voice channel from its members again and returns the number"""
+        count = self.counts[channel.id] = sum(1 for member in channel.members if not member.bot)
+
+        return count
+
+    def clear(self):
+        """forgets all counts, e.g. after voice events may have been missed; they are counted again when read"""
+        self.counts = {}
+
+    def update(self, member, before, after):
+        """applies a voice state update; call this for every update, before anything reads the counts"""
+        if member.bot or before.channel == after.channel:
+            return
+
+        # channels that have not been counted yet are counted from their members when they are read first
+        if before.channel is not None and before.channel.id in self.counts:
+            self.counts[before.channel.id] = max(0, self.counts[before.channel.id] - 1)
+
+        if after.channel is not None and after.channel.id in self.counts:
+            self.counts[after.channel.id] += 1
+
+
+# idle scheduler
+class IdleScheduler:
+    """one timer per guild, all served by a single task sleeping until the earliest deadline
+
+    arming a timer again replaces it and cancelling only forgets it; outdated heap entries are skipped when they are due
+    """
+    def __init__(self, callback, timeout=30):
+        self.callback = callback    # coroutine function, called with the guild id and the data of an expired timer
+        self.timeout = timeout    # seconds
+
+        self.heap = []    # [(deadline, sequence number, guild_id), ...]
+        self.timers = {}    # {guild_id: (sequence number, data), ...} of the armed timers
+        self.sequence = 0
+
+        self.task = None
+        self.changed = asyncio.Event()    # set when a timer is armed, so the task can sleep for a shorter time
+
+        self.armed = 0
+        self.cancelled = 0
+        self.expired = 0
+
+    def arm(self, guild_id, data=None):
+        """starts the timer of a guild, unless it is running already"""
+        if guild_id in self.timers:
+            return
+
+        self.sequence += 1
+        self.timers[guild_id] = (self.sequence, data)
+        heapq.heappush(self.heap, (monotonic() + self.timeout, self.sequence, guild_id))
+        self.armed += 1
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        else:
+            self.changed.set()
+
+    def cancel(self, guild_id):
+        """stops the timer of a guild if it is running"""
+        if self.timers.pop(guild_id, None) is not None:
+            self.cancelled += 1
+
+    def is_armed(self, guild_id):
+        """checks whether the timer of a guild is running"""
+        return guild_id in self.timers
+
+    async def run(self):
+        """waits for the earliest deadline and calls the callback for every expired timer"""
+        while True:
+            # drop cancelled and replaced timers
+            while self.heap and self.timers.get(self.heap[0][2], (None,))[0] != self.heap[0][1]:
+                heapq.heappop(self.heap)
+
+            self.changed.clear()
+
+            if not self.heap:
+                # sleep until the next timer is armed
+                await self.changed.wait()
+                continue
+
+            deadline, sequence, guild_id = self.heap[0]
+            delay = deadline - monotonic()
+
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+                continue
+
+            heapq.heappop(self.heap)
+            sequence, data = self.timers.pop(guild_id)
+            self.expired += 1
+
+            try:
+                await self.callback(guild_id, data)
+
+            except Exception as e:
+                logger.exception(e)
+
+    def close(self):
+        """stops the task and forgets all timers"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        self.heap = []
+        self.timers = {}
+
+    def stats(self):
+        """returns the number of running, armed, cancelled and expired timers"""
+        return {
+            'running': len(self.timers),
+            'armed': self.armed,
+            'cancelled': self.cancelled,
+            'expired': self.expired
+        }